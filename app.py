@@ -1,119 +1,208 @@
-from flask import Flask, render_template, redirect, url_for, request, flash, session
+from flask import Flask, Blueprint, current_app, render_template, redirect, url_for, request, flash, session, jsonify, abort, Response
 from flask_login import LoginManager, UserMixin, login_user, login_required, logout_user, current_user
-from authlib.integrations.flask_client import OAuth
 import os
+import re
 from datetime import datetime
 from dotenv import load_dotenv
-import paypalrestsdk
-
-load_dotenv()
-
-app = Flask(__name__)
-app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'dev-key-123')
-
-# Database configuration for Vercel/Production
-if os.environ.get('VERCEL'):
-    # Use /tmp for SQLite on Vercel (read-only filesystem)
-    # NOTE: Data will be wiped on every deployment. Use PostgreSQL for persistence.
-    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:////tmp/pubg_tournaments.db'
-else:
-    app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', 'sqlite:///pubg_tournaments.db')
-
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+from markupsafe import Markup
+import click
+from sqlalchemy import update, func
 
 import logging
 from extensions import db
+import integrations
+from integrations import get_pubg_api, get_paypal, get_oauth, get_standings_engine, loaded
+import metrics
+from models import User, Tournament, Payout, Donation, Sponsor, SyncJob
+from jobs import SyncWorker
+from stats_sync import ingest_matches
+from leaderboard import get_leaderboard_page, PLATFORMS
+from counters import CreditAggregator
+from payouts import PayoutBatcher
+from registrations import join_tournament, leave_tournament
+from tournament_listing import get_tournament_page, get_waitlist_counts, card_key, parse_date, STATUSES
+from fragment_cache import FragmentCache
+from http_cache import public_page, bump_version
+import user_cache
+from live_standings import StandingsBroadcaster
+from player_stats import get_player_stats, get_tournament_history, rebuild as rebuild_player_stats
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-login_manager = LoginManager(app)
-db.init_app(app)
+login_manager = LoginManager()
+login_manager.login_view = 'main.login'
+
+# Every route and CLI command; create_app registers them on each app it builds
+bp = Blueprint('main', __name__, cli_group=None)
+
+# Rendered tournament cards, keyed on the fields they display
+card_cache = FragmentCache()
 
-from models import User, Tournament, Registration, Payout, TournamentMatch, MatchResult, Donation, Sponsor
+def match_cache_stats():
+    api = loaded('pubg_api')
+    if api is None:
+        return None
+    stats = api.match_cache.stats()
+    return {'hits': stats['memory_hits'] + stats['disk_hits'], 'misses': stats['misses']}
 
-with app.app_context():
+metrics.register_cache('tournament_cards', card_cache.stats)
+metrics.register_cache('pubg_matches', match_cache_stats)
+metrics.register_cache('users', user_cache.stats)
+
+def create_app(config=None):
+    # Builds and configures the app without touching the database or any remote service;
+    # schema creation is `flask init-db` (or AUTO_CREATE_TABLES) and integrations load on first use
+    load_dotenv()
+
+    app = Flask(__name__)
+    app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'dev-key-123')
+
+    # Database configuration for Vercel/Production
+    if os.environ.get('VERCEL'):
+        # Use /tmp for SQLite on Vercel (read-only filesystem)
+        # NOTE: Data will be wiped on every deployment. Use PostgreSQL for persistence.
+        app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:////tmp/pubg_tournaments.db'
+    else:
+        app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', 'sqlite:///pubg_tournaments.db')
+
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    # The /tmp SQLite database on Vercel starts empty on every cold start, so create tables lazily there
+    app.config['AUTO_CREATE_TABLES'] = os.environ.get('AUTO_CREATE_TABLES', '1' if os.environ.get('VERCEL') else '0').lower() in ('1', 'true', 'yes')
+    if config:
+        app.config.update(config)
+
+    login_manager.init_app(app)
+    db.init_app(app)
+    integrations.init_app(app)
+
+    if app.config['AUTO_CREATE_TABLES']:
+        tables_ready = []
+
+        @app.before_request
+        def create_tables_once():
+            if not tables_ready:
+                create_tables()
+                tables_ready.append(True)
+
+    app.register_blueprint(bp)
+    metrics.init_app(app)
+
+    # Background helpers belong to the app they were built for; none starts a thread until used
+    app.extensions['credit_aggregator'] = CreditAggregator(app)
+    app.extensions['payout_batcher'] = PayoutBatcher(app, get_paypal)
+    # Stat syncs run off the request path; workers start on the first enqueued job
+    app.extensions['sync_worker'] = SyncWorker(app, get_pubg_api)
+    # Live standings streams share one poll loop per tournament
+    app.extensions['standings_broadcaster'] = StandingsBroadcaster(app, get_standings_engine)
+    return app
+
+def create_tables():
     try:
         db.create_all()
         logger.info("Database tables created successfully")
     except Exception as e:
         logger.error(f"Error creating database tables: {e}")
 
-login_manager.login_view = 'login'
-
-oauth = OAuth(app)
-
-# Xbox (Microsoft) OAuth Configuration
-xbox = oauth.register(
-    name='xbox',
-    client_id=os.environ.get('XBOX_CLIENT_ID'),
-    client_secret=os.environ.get('XBOX_CLIENT_SECRET'),
-    server_metadata_url='https://login.microsoftonline.com/common/v2.0/.well-known/openid-configuration',
-    client_kwargs={'scope': 'openid profile email XboxLive.signin'}
-)
-
-# PlayStation (PSN) OAuth Configuration
-# Note: Sony requires official partner status for PSN OAuth. 
-# This is a placeholder for when you obtain your Client ID/Secret.
-psn = oauth.register(
-    name='psn',
-    client_id=os.environ.get('PSN_CLIENT_ID'),
-    client_secret=os.environ.get('PSN_CLIENT_SECRET'),
-    access_token_url='https://ca.account.sony.com/api/authz/v3/oauth/token',
-    authorize_url='https://ca.account.sony.com/api/authz/v3/oauth/authorize',
-    api_base_url='https://us-prof.np.community.playstation.net/userProfile/v1/users/',
-    client_kwargs={'scope': 'psn:s2s'}
-)
-
-# PayPal Configuration
-paypalrestsdk.configure({
-    "mode": os.environ.get("PAYPAL_MODE", "sandbox"), # sandbox or live
-    "client_id": os.environ.get("PAYPAL_CLIENT_ID", "YOUR_CLIENT_ID"),
-    "client_secret": os.environ.get("PAYPAL_CLIENT_SECRET", "YOUR_CLIENT_SECRET")
-})
-
-from pubg_api import PUBGAPI
-
-pubg_api = PUBGAPI()
+@bp.cli.command('init-db')
+def init_db():
+    """Create any missing database tables (existing ones are left as they are, see schema_upgrade.sql)."""
+    create_tables()
+    click.echo("Database tables created.")
 
 @login_manager.user_loader
 def load_user(user_id):
-    return db.session.get(User, int(user_id))
+    # Served from the per-process identity cache; routes that change a user load the row themselves
+    return user_cache.load(int(user_id))
 
 # Routes
-@app.route('/')
-@app.route('/index')
+@bp.route('/')
+@bp.route('/index')
+@public_page
 def index():
-    top_players = db.session.query(User).order_by(User.total_wins.desc()).limit(5).all()
+    top_players = [user for _, user in get_leaderboard_page(per_page=5)[0]]
     active_sponsors = db.session.query(Sponsor).all()
     return render_template('index.html', top_players=top_players, sponsors=active_sponsors)
 
-@app.route('/tournament/<int:tournament_id>/donate', methods=['POST'])
+@bp.route('/leaderboard')
+def leaderboard():
+    platform = request.args.get('platform')
+    if platform not in PLATFORMS:
+        platform = None
+    players, next_cursor = get_leaderboard_page(platform=platform, cursor=request.args.get('after'))
+    return render_template('leaderboard.html', players=players, platform=platform, platforms=PLATFORMS, next_cursor=next_cursor)
+
+@bp.route('/tournament/<int:tournament_id>/donate', methods=['POST'])
 def donate_to_tournament(tournament_id):
-    tournament = db.get_or_404(Tournament, tournament_id)
     amount = float(request.form.get('amount', 0))
     donor_name = request.form.get('donor_name', 'Anonymous')
     
     if amount > 0:
-        donation = Donation(tournament_id=tournament.id, amount=amount, donor_name=donor_name)
-        tournament.donation_total += amount
+        # Increment in SQL rather than read-modify-write so concurrent donations never overwrite each other
+        updated = db.session.execute(
+            update(Tournament)
+            .where(Tournament.id == tournament_id)
+            .values(donation_total=Tournament.donation_total + amount)
+        ).rowcount
+        if not updated:
+            db.session.rollback()
+            abort(404)
+        donation = Donation(tournament_id=tournament_id, amount=amount, donor_name=donor_name)
         db.session.add(donation)
         db.session.commit()
+        bump_version()
         flash(f"Thank you for your ${amount:.2f} donation!")
-    return redirect(url_for('tournaments'))
+    else:
+        db.get_or_404(Tournament, tournament_id)
+    return redirect(url_for('main.tournaments'))
 
-@app.route('/tournament/<int:tournament_id>/earn-credit', methods=['POST'])
+@bp.route('/tournament/<int:tournament_id>/earn-credit', methods=['POST'])
 @login_required
 def earn_sponsor_credit(tournament_id):
     # Simulated: User interacts with a sponsor (e.g., watches an ad)
     tournament = db.get_or_404(Tournament, tournament_id)
     credit_amount = 0.50 # Fixed credit per interaction
-    tournament.sponsor_credit_total += credit_amount
-    db.session.commit()
+    current_app.extensions['credit_aggregator'].add(tournament.id, credit_amount)
     flash(f"You earned ${credit_amount:.2f} in sponsor credit for this tournament prize pool!")
-    return redirect(url_for('tournaments'))
+    return redirect(url_for('main.tournaments'))
+
+@bp.cli.command('reconcile-donations')
+def reconcile_donations():
+    """Recompute every Tournament.donation_total from its Donation rows."""
+    donations = db.session.query(func.coalesce(func.sum(Donation.amount), 0.0)).filter(Donation.tournament_id == Tournament.id).scalar_subquery()
+    count = db.session.execute(update(Tournament).values(donation_total=donations)).rowcount
+    db.session.commit()
+    bump_version()
+    click.echo(f"Reconciled donation totals for {count} tournaments.")
+
+@bp.route('/tournament/<int:tournament_id>/join', methods=['POST'])
+@login_required
+def join_tournament_route(tournament_id):
+    tournament = db.get_or_404(Tournament, tournament_id)
+    if tournament.status == 'completed':
+        flash("This tournament has already finished.")
+        return redirect(url_for('main.tournaments'))
+
+    status = join_tournament(tournament.id, current_user.id)
+    if status == 'registered':
+        flash(f"You're in! Your slot for {tournament.title} is confirmed.")
+    elif status == 'waitlisted':
+        flash(f"{tournament.title} is full, you've been added to the waitlist.")
+    else:
+        flash("You're already registered for this tournament.")
+    return redirect(url_for('main.tournaments'))
+
+@bp.route('/tournament/<int:tournament_id>/leave', methods=['POST'])
+@login_required
+def leave_tournament_route(tournament_id):
+    db.get_or_404(Tournament, tournament_id)
+    if leave_tournament(tournament_id, current_user.id):
+        flash("You've left the tournament.")
+    else:
+        flash("You weren't registered for this tournament.")
+    return redirect(url_for('main.tournaments'))
 
-@app.route('/tournament/<int:tournament_id>/sync-stats', methods=['POST'])
+@bp.route('/tournament/<int:tournament_id>/sync-stats', methods=['POST'])
 @login_required
 def sync_tournament_stats(tournament_id):
     # This route would be used to fetch stats for a match in a tournament
@@ -123,104 +212,157 @@ def sync_tournament_stats(tournament_id):
     
     if not match_id:
         flash("Match ID is required.")
-        return redirect(url_for('tournaments'))
-
-    match_data = pubg_api.get_match_details(tournament.platform, match_id)
-    if not match_data:
-        flash("Could not fetch match data from PUBG API.")
-        return redirect(url_for('tournaments'))
+        return redirect(url_for('main.tournaments'))
+
+    job, created = current_app.extensions['sync_worker'].enqueue(tournament, match_id)
+    if created and job.status in ('queued', 'running'):
+        flash(f"Stats sync queued for match {match_id} (job #{job.id}).")
+    elif created:
+        # Ran in the request (no background workers)
+        flash(f"Stats sync {job.status} for match {match_id} (job #{job.id}).")
+    else:
+        flash(f"Match {match_id} is already {job.status} (job #{job.id}).")
+    return redirect(url_for('main.tournaments'))
 
-    # Create match record
-    new_match = TournamentMatch(tournament_id=tournament.id, match_id=match_id)
-    db.session.add(new_match)
-    
-    # Process participants
-    registrations = db.session.query(Registration).filter_by(tournament_id=tournament.id).all()
-    for reg in registrations:
-        user = db.session.get(User, reg.user_id)
-        # Use xbox_gamertag or psn_id depending on platform
-        gamertag = user.xbox_gamertag if tournament.platform.lower() == 'xbox' else user.psn_id
-        
-        if not gamertag:
-            continue
-
-        # Get player account ID (should ideally be stored in User model)
-        player_data = pubg_api.get_player_stats(tournament.platform, gamertag)
-        if player_data and 'data' in player_data:
-            account_id = player_data['data'][0]['id']
-            stats = pubg_api.extract_player_stats_from_match(match_data, account_id)
-            
-            if stats:
-                result = MatchResult(
-                    match=new_match,
-                    user_id=user.id,
-                    kills=stats['kills'],
-                    placement=stats['placement'],
-                    win=stats['win']
-                )
-                db.session.add(result)
-                
-                # Update user total stats
-                user.total_kills += stats['kills']
-                if stats['win']:
-                    user.total_wins += 1
-                    # Award prize for winning (Total Prize Pool = base + donations + sponsor credits)
-                    user.balance += tournament.total_prize_pool 
+@bp.route('/sync-jobs/<int:job_id>')
+@login_required
+def sync_job_status(job_id):
+    job = db.get_or_404(SyncJob, job_id)
+    return jsonify(job.to_dict())
+
+@bp.cli.command('sync-worker')
+def run_sync_worker():
+    """Process queued stat sync jobs in the foreground."""
+    sync_worker = current_app.extensions['sync_worker']
+    sync_worker.start()
+    try:
+        for thread in sync_worker.threads:
+            thread.join()
+    except KeyboardInterrupt:
+        sync_worker.stop()
+
+@bp.cli.command('ingest-matches')
+@click.argument('tournament_id', type=int)
+@click.argument('match_ids', nargs=-1, required=True)
+@click.option('--workers', default=8, show_default=True, help='Concurrent PUBG API downloads.')
+@click.option('--telemetry', is_flag=True, help="Also stream each match's telemetry for damage, knocks and timelines.")
+def ingest_matches_command(tournament_id, match_ids, workers, telemetry):
+    """Backfill several PUBG matches into a tournament."""
+    tournament = db.session.get(Tournament, tournament_id)
+    if tournament is None:
+        raise click.ClickException(f"Tournament {tournament_id} not found.")
+    outcome = ingest_matches(get_pubg_api(), tournament, match_ids, workers=workers, telemetry=telemetry)
+    for match_id, status in outcome.items():
+        click.echo(f"{match_id}: {status}")
+
+@bp.route('/tournament/<int:tournament_id>/standings')
+def tournament_standings(tournament_id):
+    tournament = db.get_or_404(Tournament, tournament_id)
+    standings = get_standings_engine().standings(tournament)
+    usernames = dict(db.session.query(User.id, User.username).filter(User.id.in_([row['user_id'] for row in standings])).all())
+    return jsonify({
+        'tournament_id': tournament.id,
+        'standings': [dict(row, username=usernames.get(row['user_id'])) for row in standings]
+    })
 
-    db.session.commit()
-    flash("Stats synced and winners awarded!")
-    return redirect(url_for('tournaments'))
+@bp.route('/tournament/<int:tournament_id>/standings/stream')
+def tournament_standings_stream(tournament_id):
+    db.get_or_404(Tournament, tournament_id)
+    return Response(
+        current_app.extensions['standings_broadcaster'].stream(tournament_id),
+        mimetype='text/event-stream',
+        # Keep proxies from caching or buffering the stream
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@bp.route('/tournament/<int:tournament_id>/live')
+def live_standings(tournament_id):
+    tournament = db.get_or_404(Tournament, tournament_id)
+    return render_template('live_standings.html', tournament=tournament)
 
-@app.route('/tournaments')
+@bp.route('/tournaments')
+@public_page
 def tournaments():
-    all_tournaments = db.session.query(Tournament).order_by(Tournament.date.desc()).all()
-    return render_template('tournaments.html', tournaments=all_tournaments)
-
-@app.route('/payout/<int:user_id>', methods=['POST'])
+    status = request.args.get('status')
+    if status not in STATUSES:
+        status = None
+    date_from = parse_date(request.args.get('from'))
+    date_to = parse_date(request.args.get('to'))
+    page, next_cursor = get_tournament_page(status=status, date_from=date_from, date_to=date_to, cursor=request.args.get('after'))
+
+    waitlists = get_waitlist_counts([t.id for t in page])
+    cards = []
+    for t in page:
+        waitlisted = waitlists.get(t.id, 0)
+        cards.append(Markup(card_cache.get_or_render(
+            card_key(t, waitlisted),
+            lambda: render_template('_tournament_card.html', t=t, waitlisted=waitlisted)
+        )))
+    return render_template(
+        'tournaments.html',
+        cards=cards,
+        statuses=STATUSES,
+        status=status,
+        date_from=date_from.strftime('%Y-%m-%d') if date_from else None,
+        date_to=date_to.strftime('%Y-%m-%d') if date_to else None,
+        next_cursor=next_cursor
+    )
+
+@bp.route('/payout/<int:user_id>', methods=['POST'])
 @login_required
 def request_payout(user_id):
     user = db.get_or_404(User, user_id)
     if user.id != current_user.id:
         flash("Unauthorized access.")
-        return redirect(url_for('index'))
+        return redirect(url_for('main.index'))
     
     if user.balance <= 0:
         flash("Insufficient balance.")
-        return redirect(url_for('index'))
-
-    # Payout logic via PayPal
-    payout = paypalrestsdk.Payout({
-        "sender_batch_header": {
-            "sender_batch_id": f"payout_{datetime.now().strftime('%Y%m%d%H%M%S')}",
-            "email_subject": "You have a tournament payout!"
-        },
-        "items": [
-            {
-                "recipient_type": "EMAIL",
-                "amount": {
-                    "value": f"{user.balance:.2f}",
-                    "currency": "USD"
-                },
-                "receiver": user.paypal_email,
-                "note": "Thank you for participating in PUBG Console Arena! Your payout includes donation funds and sponsor credits.",
-                "sender_item_id": f"item_{user.id}"
-            }
-        ]
-    })
-
-    if payout.create():
-        new_payout = Payout(user_id=user.id, amount=user.balance, status='completed')
-        user.balance = 0
-        db.session.add(new_payout)
-        db.session.commit()
-        flash("Payout successful! Check your PayPal account.")
-    else:
-        flash(f"Payout failed: {payout.error}")
-        
-    return redirect(url_for('index'))
+        return redirect(url_for('main.index'))
+
+    receiver = (user.paypal_email or '').strip()
+    if not re.fullmatch(r'[^@\s]+@[^@\s]+\.[^@\s]+', receiver):
+        flash("Add a valid PayPal email to your profile before requesting a payout.")
+        return redirect(url_for('main.dashboard'))
+
+    # Move the balance into a pending payout; the conditional update fails if the balance changed meanwhile
+    amount = user.balance
+    moved = db.session.execute(
+        update(User).where(User.id == user.id, User.balance == amount).values(balance=0, version=User.version + 1)
+    ).rowcount
+    if not moved:
+        db.session.rollback()
+        flash("Your balance changed, please try again.")
+        return redirect(url_for('main.dashboard'))
+    db.session.add(Payout(user_id=user.id, amount=amount, status='pending', receiver=receiver))
+    db.session.commit()
+    user_cache.invalidate(user.id)
+    current_app.extensions['payout_batcher'].wake()
+    flash(f"Payout of ${amount:.2f} requested! It will be sent to your PayPal account shortly.")
+    return redirect(url_for('main.index'))
+
+@bp.cli.command('resolve-payout-batch')
+@click.argument('sender_batch_id')
+@click.argument('payout_batch_id')
+def resolve_payout_batch(sender_batch_id, payout_batch_id):
+    """Link payouts held for review to the PayPal batch they were sent in (from the PayPal dashboard)."""
+    count = current_app.extensions['payout_batcher'].resolve(sender_batch_id, payout_batch_id)
+    click.echo(f"Linked {count} payouts to PayPal batch {payout_batch_id}; the next process-payouts run settles them.")
+
+@bp.cli.command('rebuild-stats')
+def rebuild_stats():
+    """Recompute the per-tournament and per-season player stat rollups from match results."""
+    tournament_rows, period_rows = rebuild_player_stats()
+    click.echo(f"Rebuilt {tournament_rows} tournament and {period_rows} season/platform stat rows.")
+
+@bp.cli.command('process-payouts')
+def process_payouts():
+    """Send pending payouts to PayPal in batches and poll submitted batches."""
+    submitted, settled = current_app.extensions['payout_batcher'].run_once()
+    click.echo(f"Submitted {submitted} payouts, settled {settled}.")
 
 # Mock Funding Source Logic
-@app.route('/admin/add-tournament', methods=['GET', 'POST'])
+@bp.route('/admin/add-tournament', methods=['GET', 'POST'])
 def add_tournament():
     # In a real app, this would be restricted to admins
     if request.method == 'POST':
@@ -237,12 +379,13 @@ def add_tournament():
         )
         db.session.add(new_t)
         db.session.commit()
+        bump_version()
         flash("Tournament added successfully!")
-        return redirect(url_for('tournaments'))
+        return redirect(url_for('main.tournaments'))
     
     return render_template('add_tournament.html')
 
-@app.route('/admin/init-sponsors')
+@bp.route('/admin/init-sponsors')
 def init_sponsors():
     # Helper to add some placeholder sponsors
     if db.session.query(Sponsor).count() == 0:
@@ -251,27 +394,38 @@ def init_sponsors():
         s3 = Sponsor(name="Red Bull", website_url="https://www.redbull.com")
         db.session.add_all([s1, s2, s3])
         db.session.commit()
+        bump_version()
         flash("Sponsors initialized!")
-    return redirect(url_for('index'))
+    return redirect(url_for('main.index'))
 
-@app.route('/update-profile', methods=['POST'])
+@bp.route('/update-profile', methods=['POST'])
 @login_required
 def update_profile():
-    current_user.xbox_gamertag = request.form.get('xbox_gamertag')
-    current_user.psn_id = request.form.get('psn_id')
-    current_user.paypal_email = request.form.get('paypal_email')
+    xbox_gamertag = request.form.get('xbox_gamertag')
+    psn_id = request.form.get('psn_id')
+    user = db.session.get(User, current_user.id)
+    # A changed gamertag invalidates the cached PUBG account ID for that shard
+    if xbox_gamertag != user.xbox_gamertag:
+        user.xbox_account_id = None
+    if psn_id != user.psn_id:
+        user.psn_account_id = None
+    user.xbox_gamertag = xbox_gamertag
+    user.psn_id = psn_id
+    user.paypal_email = request.form.get('paypal_email')
+    user.version = User.version + 1
     db.session.commit()
+    user_cache.invalidate(user.id)
     flash("Profile updated successfully!")
-    return redirect(url_for('dashboard'))
+    return redirect(url_for('main.dashboard'))
 
-@app.route('/login/xbox')
+@bp.route('/login/xbox')
 def login_xbox():
-    redirect_uri = url_for('auth_xbox', _external=True)
-    return xbox.authorize_redirect(redirect_uri, prompt='select_account')
+    redirect_uri = url_for('main.auth_xbox', _external=True)
+    return get_oauth().xbox.authorize_redirect(redirect_uri, prompt='select_account')
 
-@app.route('/auth/xbox')
+@bp.route('/auth/xbox')
 def auth_xbox():
-    token = xbox.authorize_access_token()
+    token = get_oauth().xbox.authorize_access_token()
     user_info = token.get('userinfo')
     if user_info:
         # 1-Click: Find or Create
@@ -290,16 +444,16 @@ def auth_xbox():
         
         login_user(user)
         flash('Successfully logged in!')
-    return redirect(url_for('dashboard'))
+    return redirect(url_for('main.dashboard'))
 
-@app.route('/login/psn')
+@bp.route('/login/psn')
 def login_psn():
-    redirect_uri = url_for('auth_psn', _external=True)
-    return psn.authorize_redirect(redirect_uri)
+    redirect_uri = url_for('main.auth_psn', _external=True)
+    return get_oauth().psn.authorize_redirect(redirect_uri)
 
-@app.route('/auth/psn')
+@bp.route('/auth/psn')
 def auth_psn():
-    token = psn.authorize_access_token()
+    token = get_oauth().psn.authorize_access_token()
     # Simulated PSN 1-Click logic
     user_id = "psn_user_id" # This would come from token/api
     user = db.session.query(User).filter_by(psn_oauth_id=user_id).first()
@@ -316,12 +470,12 @@ def auth_psn():
     
     login_user(user)
     flash('Successfully logged in with PSN!')
-    return redirect(url_for('dashboard'))
+    return redirect(url_for('main.dashboard'))
 
-@app.route('/login', methods=['GET', 'POST'])
+@bp.route('/login', methods=['GET', 'POST'])
 def login():
     if current_user.is_authenticated:
-        return redirect(url_for('index'))
+        return redirect(url_for('main.index'))
     if request.method == 'POST':
         email = request.form.get('email')
         password = request.form.get('password')
@@ -329,15 +483,15 @@ def login():
         if user and user.check_password(password):
             login_user(user)
             flash('Logged in successfully!')
-            return redirect(url_for('dashboard'))
+            return redirect(url_for('main.dashboard'))
         else:
             flash('Invalid email or password')
     return render_template('login.html')
 
-@app.route('/register', methods=['GET', 'POST'])
+@bp.route('/register', methods=['GET', 'POST'])
 def register():
     if current_user.is_authenticated:
-        return redirect(url_for('index'))
+        return redirect(url_for('main.index'))
     
     selected_platform = request.args.get('platform', 'Xbox') # Default to Xbox
 
@@ -349,37 +503,45 @@ def register():
         
         if db.session.query(User).filter_by(email=email).first():
             flash('Email already exists')
-            return redirect(url_for('register'))
+            return redirect(url_for('main.register'))
         
         user = User(username=username, email=email, platform=platform)
         user.set_password(password)
         db.session.add(user)
         db.session.commit()
         flash('Registration successful! Please login.')
-        return redirect(url_for('login'))
+        return redirect(url_for('main.login'))
     return render_template('register.html', platform=selected_platform)
 
-@app.route('/logout')
+@bp.route('/logout')
 @login_required
 def logout():
     logout_user()
-    return redirect(url_for('index'))
+    return redirect(url_for('main.index'))
 
-@app.route('/dashboard')
+@bp.route('/dashboard')
 @login_required
 def dashboard():
-    return render_template('dashboard.html')
-
-@app.errorhandler(404)
+    return render_template(
+        'dashboard.html',
+        # Balance and profile as committed now, even if another process changed them
+        user=user_cache.load(current_user.id, fresh=True),
+        stats=get_player_stats(current_user.id),
+        history=get_tournament_history(current_user.id)
+    )
+
+@bp.app_errorhandler(404)
 def page_not_found(e):
     return render_template('404.html'), 404
 
 # Route to serve static docs locally for testing
-@app.route('/static-preview/<path:filename>')
+@bp.route('/static-preview/<path:filename>')
 def static_preview(filename):
     from flask import send_from_directory
     return send_from_directory('docs', filename)
 
+app = create_app()
+
 if __name__ == '__main__':
     with app.app_context():
         db.create_all()
@@ -0,0 +1,232 @@
+"""Request throughput and latency benchmark against a seeded database.
+
+    python benchmarks/load.py --scale small --requests 500 --concurrency 8
+
+Seeds a synthetic dataset (see seed.py) unless --db points at one that already exists,
+swaps the PUBG API and PayPal for local stand-ins (see stubs.py), then drives each
+scenario through the Flask test client from --concurrency threads. Prints a JSON report
+with throughput and p50/p95/p99 latency per scenario. The write scenarios POST to the
+sync-stats and payout routes; the payouts they request are then sent with one
+`flask process-payouts` run, reported alongside.
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Scenarios that write go through one thread; SQLite only has one writer anyway
+WRITE_SCENARIOS = ('sync', 'payouts')
+SCENARIOS = ('index', 'tournaments', 'tournaments_filtered', 'leaderboard', 'leaderboard_platform', 'standings', 'dashboard') + WRITE_SCENARIOS
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+def summarize(latencies, errors, elapsed, concurrency):
+    latencies = sorted(latencies)
+    ms = lambda value: round(value * 1000, 3) if value is not None else None
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'concurrency': concurrency,
+        'elapsed_s': round(elapsed, 3),
+        'throughput_rps': round(len(latencies) / elapsed, 1) if elapsed else None,
+        'latency_ms': {
+            'p50': ms(percentile(latencies, 50)),
+            'p95': ms(percentile(latencies, 95)),
+            'p99': ms(percentile(latencies, 99)),
+            'max': ms(latencies[-1] if latencies else None),
+        },
+    }
+
+def run_scenario(make_op, total, concurrency, warmup):
+    # make_op() is called once per worker thread and returns a callable doing one request;
+    # the callable returns False (or raises) on failure
+    counter = iter(range(total))
+    counter_lock = threading.Lock()
+    latencies = []
+    errors = []
+
+    def worker():
+        op = make_op()
+        for _ in range(warmup):
+            op()
+        local = []
+        failed = 0
+        while True:
+            with counter_lock:
+                if next(counter, None) is None:
+                    break
+            start = time.perf_counter()
+            try:
+                ok = op() is not False
+            except Exception:
+                ok = False
+            local.append(time.perf_counter() - start)
+            failed += not ok
+        latencies.extend(local)
+        errors.append(failed)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for future in [pool.submit(worker) for _ in range(concurrency)]:
+            future.result()
+    return summarize(latencies, sum(errors), time.perf_counter() - start, concurrency)
+
+def http_op(app, path_for, login=None, method='GET', data=None, expect=200):
+    def make_op():
+        client = app.test_client()
+        rng = random.Random(threading.get_ident())
+        if login:
+            sign_in(client, login(rng))
+
+        def op():
+            response = client.open(path_for(rng), method=method, data=data(rng) if data else None)
+            return response.status_code == expect
+        return op
+    return make_op
+
+def sign_in(client, user_id):
+    with client.session_transaction() as session:
+        session['_user_id'] = str(user_id)
+        session['_fresh'] = True
+
+def main():
+    from seed import SCALES
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scale', choices=sorted(SCALES), default='small')
+    parser.add_argument('--db', help='Seeded SQLite file to reuse; created with --scale if missing')
+    parser.add_argument('--requests', type=int, default=200, help='Requests per scenario')
+    parser.add_argument('--concurrency', type=int, default=4, help='Client threads for read scenarios')
+    parser.add_argument('--warmup', type=int, default=3, help='Untimed requests per thread before measuring')
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS), help='Comma-separated subset of: ' + ', '.join(SCENARIOS))
+    parser.add_argument('--payout-batch', type=int, default=100, help='Payouts per PayPal batch when the requested payouts are sent')
+    parser.add_argument('--output', help='Write the JSON report here instead of stdout')
+    args = parser.parse_args()
+
+    scenarios = [name for name in args.scenarios.split(',') if name]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    tmp = tempfile.TemporaryDirectory()
+    db_path = os.path.abspath(args.db or os.path.join(tmp.name, 'bench.db'))
+    os.environ['DATABASE_URL'] = f"sqlite:///{db_path}"
+    os.environ['PUBG_MATCH_CACHE_DIR'] = os.path.join(tmp.name, 'match_cache')
+    os.environ.pop('VERCEL', None)
+    # Syncs run inside the request and payouts wait for process-payouts, so no background
+    # thread does work the timings miss
+    os.environ['SYNC_WORKERS'] = '0'
+    os.environ['PAYOUT_BATCH_INTERVAL'] = '0'
+
+    from app import app, db
+    from models import User, Tournament, Registration
+    from sqlalchemy import update
+    import integrations
+    from stubs import FakePUBGAPI, FakePayPal
+
+    with app.app_context():
+        seeded = time.perf_counter()
+        if not os.path.exists(db_path) or not db.inspect(db.engine).has_table('user'):
+            db.create_all()
+            from seed import seed
+            seed(db, args.scale)
+        seed_s = time.perf_counter() - seeded
+
+        users = db.session.query(db.func.max(User.id)).scalar()
+        tournaments = db.session.query(db.func.max(Tournament.id)).scalar()
+        # Played tournaments are the ones with registrations
+        played = [row.tournament_id for row in db.session.query(Registration.tournament_id).distinct()]
+        participants = [
+            f"account.{row.user_id}" for row in db.session.query(Registration.user_id).filter(Registration.tournament_id == played[0])
+        ] if played else []
+
+    api = FakePUBGAPI(os.path.join(tmp.name, 'match_cache'), participants)
+    integrations.override(app, 'pubg_api', api)
+    integrations.override(app, 'paypal', FakePayPal)
+    app.extensions['payout_batcher'].batch_size = args.payout_batch
+
+    # Users with a balance to withdraw, one per payout request
+    payees = iter(range(1, users + 1))
+    payees_lock = threading.Lock()
+    if 'payouts' in scenarios:
+        with app.app_context():
+            db.session.execute(
+                update(User).where(User.id <= min(args.requests, users)).values(balance=User.balance + 1.0, paypal_email=db.func.coalesce(User.paypal_email, 'bench@example.com'))
+            )
+            db.session.commit()
+
+    def payouts_op():
+        client = app.test_client()
+
+        def op():
+            # Each request withdraws a different user's whole balance
+            with payees_lock:
+                user_id = next(payees)
+            sign_in(client, user_id)
+            return client.post(f"/payout/{user_id}").status_code == 302
+        return op
+
+    sync_ids = iter(range(10 ** 9))
+
+    ops = {
+        'index': http_op(app, lambda rng: '/'),
+        'tournaments': http_op(app, lambda rng: '/tournaments'),
+        'tournaments_filtered': http_op(app, lambda rng: f"/tournaments?status={rng.choice(('upcoming', 'ongoing', 'completed'))}"),
+        'leaderboard': http_op(app, lambda rng: '/leaderboard'),
+        'leaderboard_platform': http_op(app, lambda rng: f"/leaderboard?platform={rng.choice(('Xbox', 'PS5'))}"),
+        'standings': http_op(app, lambda rng: f"/tournament/{rng.choice(played or [1])}/standings"),
+        'dashboard': http_op(app, lambda rng: '/dashboard', login=lambda rng: rng.randint(1, users)),
+        'sync': http_op(app, lambda rng: f"/tournament/{played[0]}/sync-stats", login=lambda rng: rng.randint(1, users),
+                        method='POST', data=lambda rng: {'match_id': f"bench-sync-{time.time_ns()}-{next(sync_ids)}"}, expect=302),
+        'payouts': payouts_op,
+    }
+
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        commit = None
+
+    report = {
+        'scale': args.scale,
+        'commit': commit,
+        'python': sys.version.split()[0],
+        'dataset': {'users': users, 'tournaments': tournaments, 'played_tournaments': len(played), 'seed_s': round(seed_s, 3)},
+        'scenarios': {},
+    }
+    for name in scenarios:
+        if name in WRITE_SCENARIOS:
+            # Writes run single-threaded and without warmup so every operation is measured
+            total = min(args.requests, users) if name == 'payouts' else args.requests
+            report['scenarios'][name] = run_scenario(ops[name], total, 1, 0)
+        else:
+            report['scenarios'][name] = run_scenario(ops[name], args.requests, args.concurrency, args.warmup)
+    report['scenarios'].get('sync', {}).update({'pubg_api_calls': api.calls})
+    if 'payouts' in report['scenarios']:
+        # Requested payouts go out through `flask process-payouts`, in --payout-batch sized batches
+        started = time.perf_counter()
+        result = app.test_cli_runner().invoke(args=['process-payouts'])
+        report['scenarios']['payouts'].update({'process_payouts_s': round(time.perf_counter() - started, 3), 'process_payouts': result.output.strip()})
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+    tmp.cleanup()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,148 @@
+"""Synthetic data generator for the benchmarks.
+
+    python benchmarks/seed.py --scale medium --db /tmp/bench.db
+
+Scales: small (1k users), medium (100k), large (1M). Generation is seeded, so the same
+scale always produces the same database.
+"""
+import os
+import sys
+import random
+import argparse
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCALES = {
+    'small': {'users': 1_000, 'tournaments': 200, 'played_tournaments': 20, 'matches': 10, 'players_per_tournament': 100},
+    'medium': {'users': 100_000, 'tournaments': 2_000, 'played_tournaments': 100, 'matches': 10, 'players_per_tournament': 100},
+    'large': {'users': 1_000_000, 'tournaments': 5_000, 'played_tournaments': 300, 'matches': 20, 'players_per_tournament': 100},
+}
+CHUNK = 10_000
+STATUSES = ('upcoming', 'ongoing', 'completed')
+
+def chunked(rows):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == CHUNK:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def seed(db, scale, seed_value=42):
+    from sqlalchemy import insert
+    from models import User, Tournament, Registration, TournamentMatch, MatchResult, Sponsor
+
+    config = SCALES[scale]
+    rng = random.Random(seed_value)
+    start = datetime(2025, 1, 1)
+
+    def users():
+        for i in range(1, config['users'] + 1):
+            platform = 'Xbox' if i % 2 else 'PS5'
+            # 90% already have a resolved PUBG account, the rest exercise batch lookups
+            account_id = f"account.{i}" if i % 10 else None
+            yield {
+                'id': i,
+                'username': f"player{i}",
+                'email': f"player{i}@bench.local",
+                'platform': platform,
+                'xbox_gamertag': f"gt{i}" if platform == 'Xbox' else None,
+                'psn_id': f"gt{i}" if platform == 'PS5' else None,
+                'xbox_account_id': account_id if platform == 'Xbox' else None,
+                'psn_account_id': account_id if platform == 'PS5' else None,
+                'paypal_email': f"player{i}@paypal.bench.local",
+                'balance': 0.0,
+                'total_kills': 0,
+                'total_wins': 0,
+            }
+
+    for chunk in chunked(users()):
+        db.session.execute(insert(User), chunk)
+    db.session.commit()
+
+    tournaments = []
+    for i in range(1, config['tournaments'] + 1):
+        tournaments.append({
+            'id': i,
+            'title': f"Bench Cup #{i}",
+            'description': 'Synthetic benchmark tournament',
+            'date': start + timedelta(hours=6 * i),
+            'base_prize_pool': float(rng.choice((50, 100, 250, 500))),
+            'donation_total': 0.0,
+            'sponsor_credit_total': 0.0,
+            'platform': 'Xbox' if i % 2 else 'PS5',
+            'status': STATUSES[i % 3],
+            'max_players': 100,
+            'slots_taken': 0,
+        })
+    for chunk in chunked(tournaments):
+        db.session.execute(insert(Tournament), chunk)
+    db.session.add_all([Sponsor(name=name, website_url=url) for name, url in (
+        ('Razer', 'https://www.razer.com'), ('Logitech G', 'https://www.logitechg.com'), ('Red Bull', 'https://www.redbull.com'))])
+    db.session.commit()
+
+    # Played tournaments get a full lobby of same-platform players and their match history
+    players = config['players_per_tournament']
+    match_id = 0
+    kills = [0] * (config['users'] + 1)
+    wins = [0] * (config['users'] + 1)
+    for tournament in tournaments[:config['played_tournaments']]:
+        parity = 1 if tournament['platform'] == 'Xbox' else 0
+        pool = range(2 - parity, config['users'] + 1, 2)
+        lobby = rng.sample(pool, min(players, len(pool)))
+        db.session.execute(insert(Registration), [
+            {'user_id': user_id, 'tournament_id': tournament['id'], 'status': 'registered'} for user_id in lobby
+        ])
+        db.session.execute(
+            Tournament.__table__.update().where(Tournament.__table__.c.id == tournament['id']).values(slots_taken=len(lobby))
+        )
+        results = []
+        for m in range(config['matches']):
+            match_id += 1
+            db.session.execute(insert(TournamentMatch), [{'id': match_id, 'tournament_id': tournament['id'], 'match_id': f"bench-{tournament['id']}-{m}"}])
+            places = list(range(1, len(lobby) + 1))
+            rng.shuffle(places)
+            for user_id, place in zip(lobby, places):
+                k = rng.randint(0, 6)
+                kills[user_id] += k
+                wins[user_id] += place == 1
+                results.append({'match_id': match_id, 'user_id': user_id, 'kills': k, 'placement': place, 'win': place == 1})
+        for chunk in chunked(results):
+            db.session.execute(insert(MatchResult), chunk)
+        db.session.commit()
+
+    totals = [{'b_id': i, 'b_kills': kills[i], 'b_wins': wins[i]} for i in range(1, config['users'] + 1) if kills[i] or wins[i]]
+    if totals:
+        from sqlalchemy import bindparam
+        users_table = User.__table__
+        statement = users_table.update().where(users_table.c.id == bindparam('b_id')).values(total_kills=bindparam('b_kills'), total_wins=bindparam('b_wins'))
+        for chunk in chunked(totals):
+            db.session.execute(statement, chunk)
+    db.session.commit()
+
+    # Bulk-inserted results bypass the incremental rollups
+    from player_stats import rebuild
+    rebuild()
+    return config
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scale', choices=sorted(SCALES), default='small')
+    parser.add_argument('--db', required=True, help='SQLite file to create (replaced if it exists)')
+    args = parser.parse_args()
+
+    if os.path.exists(args.db):
+        os.remove(args.db)
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.abspath(args.db)}"
+    sys.path.insert(0, ROOT)
+    from app import app, db
+    with app.app_context():
+        db.create_all()
+        seed(db, args.scale)
+    print(f"Seeded {args.scale} dataset into {args.db}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""Cold start benchmark: import time and first-request latency in fresh interpreters.
+
+    python benchmarks/startup.py --runs 10 --max-import-ms 800 --max-first-request-ms 300
+
+Prints a JSON report; exits 1 if a median exceeds its threshold, so CI can catch regressions.
+"""
+import os
+import sys
+import json
+import argparse
+import tempfile
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = """
+import sys, time, json
+sys.path.insert(0, {root!r})
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+client = app.app.test_client()
+response = client.get({path!r})
+done = time.perf_counter()
+heavy = [name for name in ('numpy', 'paypalrestsdk', 'authlib', 'requests') if name in sys.modules]
+print(json.dumps({{'import_ms': (imported - start) * 1000, 'first_request_ms': (done - imported) * 1000, 'status': response.status_code, 'heavy_modules': heavy}}))
+"""
+
+def run_once(path):
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ)
+        env.pop('VERCEL', None)
+        env.update({
+            'DATABASE_URL': f"sqlite:///{os.path.join(tmp, 'bench.db')}",
+            'AUTO_CREATE_TABLES': '1',
+            'PUBG_MATCH_CACHE_DIR': os.path.join(tmp, 'match_cache'),
+        })
+        result = subprocess.run(
+            [sys.executable, '-c', PROBE.format(root=ROOT, path=path)],
+            env=env, cwd=tmp, capture_output=True, text=True, check=True
+        )
+        return json.loads(result.stdout.strip().splitlines()[-1])
+
+def summarize(values):
+    ordered = sorted(values)
+    return {
+        'median': round(statistics.median(ordered), 2),
+        'min': round(ordered[0], 2),
+        'max': round(ordered[-1], 2),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--path', default='/')
+    parser.add_argument('--max-import-ms', type=float)
+    parser.add_argument('--max-first-request-ms', type=float)
+    args = parser.parse_args()
+
+    samples = [run_once(args.path) for _ in range(args.runs)]
+    report = {
+        'runs': args.runs,
+        'path': args.path,
+        'import_ms': summarize([s['import_ms'] for s in samples]),
+        'first_request_ms': summarize([s['first_request_ms'] for s in samples]),
+        'statuses': sorted({s['status'] for s in samples}),
+        'heavy_modules_loaded': sorted({m for s in samples for m in s['heavy_modules']}),
+    }
+    print(json.dumps(report, indent=2))
+
+    failed = (
+        (args.max_import_ms is not None and report['import_ms']['median'] > args.max_import_ms)
+        or (args.max_first_request_ms is not None and report['first_request_ms']['median'] > args.max_first_request_ms)
+    )
+    sys.exit(1 if failed else 0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""Local stand-ins for the PUBG API and PayPal SDK used by the benchmarks."""
+import random
+import itertools
+import threading
+
+from pubg_api import PUBGAPI
+from match_cache import MatchCache
+
+class FakePUBGAPI(PUBGAPI):
+    # Serves deterministic match documents for whatever accounts are in `participants`
+    def __init__(self, cache_dir, participants=None):
+        super().__init__(api_key='bench', base_url='http://127.0.0.1:9', match_cache=MatchCache(cache_dir=cache_dir))
+        self.participants = participants or []
+        self.calls = 0
+
+    def get_account_ids(self, platform, gamertags):
+        self.calls += 1
+        # Seeded gamertags are gt<N> and their accounts account.<N>
+        return {tag: f"account.{tag[2:]}" for tag in gamertags if tag and tag.startswith('gt')}
+
+    def get_match_details(self, platform, match_id):
+        self.calls += 1
+        rng = random.Random(match_id)
+        places = list(range(1, len(self.participants) + 1))
+        rng.shuffle(places)
+        included = [
+            {
+                'type': 'participant',
+                'id': f"participant.{i}",
+                'attributes': {'stats': {'playerId': account_id, 'kills': rng.randint(0, 6), 'winPlace': place}}
+            }
+            for i, (account_id, place) in enumerate(zip(self.participants, places))
+        ]
+        return {'data': {'type': 'match', 'id': match_id}, 'included': included}
+
+    def get_telemetry_summary(self, telemetry_url, account_ids=None):
+        return None
+
+class FakePayout:
+    batches = {}
+    counter = itertools.count(1)
+    lock = threading.Lock()
+
+    def __init__(self, attributes):
+        self.attributes = attributes
+        self.error = None
+
+    def create(self):
+        with self.lock:
+            batch_id = f"FAKEBATCH{next(self.counter)}"
+            self.batches[batch_id] = [
+                {
+                    'payout_item': {'sender_item_id': item['sender_item_id']},
+                    'transaction_status': 'SUCCESS',
+                    'transaction_id': f"TX{item['sender_item_id']}"
+                }
+                for item in self.attributes['items']
+            ]
+        self.attributes['batch_header'] = {'payout_batch_id': batch_id, 'batch_status': 'PENDING'}
+        return True
+
+    def to_dict(self):
+        return self.attributes
+
+    @classmethod
+    def find(cls, payout_batch_id):
+        return cls({'batch_header': {'payout_batch_id': payout_batch_id}, 'items': cls.batches[payout_batch_id]})
+
+class FakePayPal:
+    # Quacks like the configured paypalrestsdk module as far as PayoutBatcher is concerned
+    Payout = FakePayout
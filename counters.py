@@ -0,0 +1,68 @@
+import os
+import atexit
+import threading
+import logging
+from collections import defaultdict
+
+from sqlalchemy import bindparam
+
+from extensions import db
+from models import Tournament
+from http_cache import bump_version
+
+logger = logging.getLogger(__name__)
+
+class CreditAggregator:
+    # Write-behind buffer for Tournament.sponsor_credit_total. Ad-watch bursts all land on one
+    # tournament row, so credits are summed in memory and applied as one increment per
+    # tournament every flush_interval seconds. An interval of 0 writes through immediately,
+    # which is what serverless deployments (no background threads) need.
+    def __init__(self, app, flush_interval=None):
+        self.app = app
+        if flush_interval is None:
+            flush_interval = float(os.environ.get('SPONSOR_CREDIT_FLUSH_INTERVAL', 0 if os.environ.get('VERCEL') else 2))
+        self.flush_interval = flush_interval
+        self.pending = defaultdict(float)
+        self.lock = threading.Lock()
+        self.thread = None
+        self.stopping = threading.Event()
+        atexit.register(self.flush)
+
+    def add(self, tournament_id, amount):
+        if self.flush_interval <= 0:
+            self._apply({tournament_id: amount})
+            return
+        with self.lock:
+            self.pending[tournament_id] += amount
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, name='credit-aggregator', daemon=True)
+                self.thread.start()
+
+    def flush(self):
+        with self.lock:
+            deltas, self.pending = self.pending, defaultdict(float)
+        if not deltas:
+            return
+        try:
+            with self.app.app_context():
+                self._apply(deltas)
+        except Exception as e:
+            logger.error(f"Could not flush sponsor credits, will retry: {e}")
+            with self.lock:
+                for tournament_id, amount in deltas.items():
+                    self.pending[tournament_id] += amount
+
+    def _apply(self, deltas):
+        tournaments = Tournament.__table__
+        db.session.execute(
+            tournaments.update()
+            .where(tournaments.c.id == bindparam('b_id'))
+            .values(sponsor_credit_total=tournaments.c.sponsor_credit_total + bindparam('b_amount')),
+            [{'b_id': tournament_id, 'b_amount': amount} for tournament_id, amount in deltas.items()]
+        )
+        db.session.commit()
+        bump_version()
+
+    def _run(self):
+        while not self.stopping.wait(self.flush_interval):
+            self.flush()
@@ -0,0 +1,41 @@
+import threading
+from collections import OrderedDict
+
+class FragmentCache:
+    # Bounded LRU of rendered HTML fragments. Keys include every field the fragment shows,
+    # so changing a tournament's prize fields, status or slots simply misses and re-renders;
+    # the stale entry ages out of the LRU.
+    def __init__(self, max_entries=2048):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_render(self, key, render):
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return self.entries[key]
+            self.misses += 1
+        fragment = render()
+        with self.lock:
+            self.entries[key] = fragment
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        return fragment
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'entries': len(self.entries)
+            }
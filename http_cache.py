@@ -0,0 +1,86 @@
+import os
+import time
+import hashlib
+import threading
+import logging
+from datetime import datetime, timezone
+from functools import wraps
+
+from flask import request, session, make_response
+from flask_login import current_user
+from sqlalchemy import update
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+
+from extensions import db
+from models import DataVersion
+
+logger = logging.getLogger(__name__)
+
+# How long a process trusts its copy of the data version before re-reading it
+VERSION_TTL = float(os.environ.get('DATA_VERSION_TTL', 1))
+# How long a shared cache (CDN) may serve a public page without revalidating
+SHARED_MAX_AGE = int(os.environ.get('PUBLIC_CACHE_SECONDS', 5))
+
+_lock = threading.Lock()
+_cached = {'version': None, 'updated_at': None, 'expires': 0.0}
+
+def current_version():
+    # Returns (version, updated_at), re-reading the DataVersion row at most every VERSION_TTL seconds
+    with _lock:
+        if _cached['version'] is not None and time.monotonic() < _cached['expires']:
+            return _cached['version'], _cached['updated_at']
+    row = db.session.get(DataVersion, 1)
+    version, updated_at = (row.version, row.updated_at) if row else (0, datetime(1970, 1, 1))
+    with _lock:
+        _cached.update(version=version, updated_at=updated_at, expires=time.monotonic() + VERSION_TTL)
+    return version, updated_at
+
+def bump_version():
+    # Call after committing a change that shows up on a public page. It runs in its own short
+    # transaction so the shared row is never locked for the length of a business transaction;
+    # it's best-effort, a failed bump only delays revalidation until the next one.
+    try:
+        updated = db.session.execute(
+            update(DataVersion).where(DataVersion.id == 1).values(version=DataVersion.version + 1, updated_at=datetime.utcnow())
+        ).rowcount
+        if not updated:
+            try:
+                with db.session.begin_nested():
+                    db.session.add(DataVersion(id=1, version=1, updated_at=datetime.utcnow()))
+            except IntegrityError:
+                # Another process created the row first; bump theirs instead
+                db.session.execute(update(DataVersion).where(DataVersion.id == 1).values(version=DataVersion.version + 1, updated_at=datetime.utcnow()))
+        db.session.commit()
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        logger.warning(f"Could not bump the data version: {e}")
+    with _lock:
+        _cached['expires'] = 0.0
+
+def public_page(view):
+    # Strong ETag + Last-Modified for anonymous visitors, so repeat visits and CDNs get a 304
+    # without running the view. Logged-in users and pending flash messages bypass the cache.
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if current_user.is_authenticated or session.get('_flashes'):
+            return view(*args, **kwargs)
+
+        version, updated_at = current_version()
+        etag = hashlib.sha1(f"{version}:{request.full_path}".encode()).hexdigest()
+        last_modified = updated_at.replace(tzinfo=timezone.utc, microsecond=0)
+
+        if etag in request.if_none_match or (
+            not request.if_none_match and request.if_modified_since and request.if_modified_since >= last_modified
+        ):
+            response = make_response('', 304)
+        else:
+            response = make_response(view(*args, **kwargs))
+        response.set_etag(etag)
+        response.last_modified = last_modified
+        response.cache_control.public = True
+        response.cache_control.max_age = 0
+        response.cache_control.s_maxage = SHARED_MAX_AGE
+        response.cache_control.must_revalidate = True
+        response.vary.add('Cookie')
+        return response
+    return wrapper
@@ -0,0 +1,103 @@
+import os
+import threading
+
+from flask import current_app
+
+# Third-party clients are built on first use instead of at import time, so a cold start
+# only pays for the integrations the first request actually touches. Each app built by
+# create_app keeps its own clients in app.extensions['integrations'].
+_lock = threading.RLock()
+
+def init_app(app):
+    app.extensions['integrations'] = {}
+
+def _get(name, build):
+    instances = current_app.extensions['integrations']
+    with _lock:
+        if name not in instances:
+            instances[name] = build()
+        return instances[name]
+
+def loaded(name):
+    # The current app's instance if it has been built already, without building it
+    return current_app.extensions['integrations'].get(name)
+
+def get_pubg_api():
+    def build():
+        from pubg_api import PUBGAPI
+        return PUBGAPI()
+    return _get('pubg_api', build)
+
+def get_paypal():
+    # paypalrestsdk resources bound to this app's own Api, rather than the SDK's process-wide default
+    def build():
+        import paypalrestsdk
+        api = paypalrestsdk.Api({
+            "mode": os.environ.get("PAYPAL_MODE", "sandbox"), # sandbox or live
+            "client_id": os.environ.get("PAYPAL_CLIENT_ID", "YOUR_CLIENT_ID"),
+            "client_secret": os.environ.get("PAYPAL_CLIENT_SECRET", "YOUR_CLIENT_SECRET"),
+            # Point at a local PayPal stand-in for testing; defaults to the sandbox/live API for the mode
+            **({"endpoint": os.environ["PAYPAL_ENDPOINT"]} if os.environ.get("PAYPAL_ENDPOINT") else {})
+        })
+        return PayPalClient(paypalrestsdk, api)
+    return _get('paypal', build)
+
+class PayPalClient:
+    # The slice of paypalrestsdk the payout batcher uses, with every call going through one Api
+    def __init__(self, sdk, api):
+        class Payout(sdk.Payout):
+            def __init__(self, attributes=None):
+                super().__init__(attributes, api=api)
+
+            @classmethod
+            def find(cls, resource_id):
+                return sdk.Payout.find(resource_id, api=api)
+
+        self.api = api
+        self.Payout = Payout
+
+def get_oauth():
+    def build():
+        from authlib.integrations.flask_client import OAuth
+        oauth = OAuth(current_app._get_current_object())
+
+        # Xbox (Microsoft) OAuth Configuration
+        # The OpenID metadata is only fetched when the first Xbox login starts
+        oauth.register(
+            name='xbox',
+            client_id=os.environ.get('XBOX_CLIENT_ID'),
+            client_secret=os.environ.get('XBOX_CLIENT_SECRET'),
+            server_metadata_url='https://login.microsoftonline.com/common/v2.0/.well-known/openid-configuration',
+            client_kwargs={'scope': 'openid profile email XboxLive.signin'}
+        )
+
+        # PlayStation (PSN) OAuth Configuration
+        # Note: Sony requires official partner status for PSN OAuth. 
+        # This is a placeholder for when you obtain your Client ID/Secret.
+        oauth.register(
+            name='psn',
+            client_id=os.environ.get('PSN_CLIENT_ID'),
+            client_secret=os.environ.get('PSN_CLIENT_SECRET'),
+            access_token_url='https://ca.account.sony.com/api/authz/v3/oauth/token',
+            authorize_url='https://ca.account.sony.com/api/authz/v3/oauth/authorize',
+            api_base_url='https://us-prof.np.community.playstation.net/userProfile/v1/users/',
+            client_kwargs={'scope': 'psn:s2s'}
+        )
+        return oauth
+    return _get('oauth', build)
+
+def get_standings_engine():
+    # Deferred because scoring pulls in NumPy
+    def build():
+        from scoring import StandingsEngine
+        return StandingsEngine()
+    return _get('standings_engine', build)
+
+def override(app, name, instance):
+    # Swap in a stand-in client for one app (benchmarks, local testing); None drops it so it is rebuilt on next use
+    instances = app.extensions['integrations']
+    with _lock:
+        if instance is None:
+            instances.pop(name, None)
+        else:
+            instances[name] = instance
@@ -0,0 +1,176 @@
+import os
+import threading
+import logging
+from datetime import datetime, timedelta
+
+from sqlalchemy.exc import IntegrityError
+
+from extensions import db
+from models import Tournament, SyncJob
+from stats_sync import sync_match, SyncError, MatchAlreadyRecorded
+
+logger = logging.getLogger(__name__)
+
+SHARDS = ('xbox', 'psn')
+
+class SyncWorker:
+    # Processes queued SyncJob rows on a small thread pool. Jobs are claimed with a
+    # conditional UPDATE, so several processes can share the same table safely.
+    # With 0 workers (serverless, no background threads) enqueue runs the job in the request.
+    def __init__(self, app, pubg_api, workers=None, per_shard=None, poll_interval=2.0, stale_after=600):
+        # pubg_api may be a PUBGAPI or a zero-argument loader returning one
+        self.app = app
+        self._pubg_api = pubg_api
+        if workers is None:
+            workers = int(os.environ.get('SYNC_WORKERS', 0 if os.environ.get('VERCEL') else 4))
+        self.workers = workers
+        # Upper bound on jobs running against one PUBG shard at a time (per process)
+        self.per_shard = per_shard or int(os.environ.get('SYNC_WORKERS_PER_SHARD', 2))
+        self.poll_interval = poll_interval
+        # Telemetry adds a multi-MB download per match, so it is opt-in
+        self.telemetry = os.environ.get('SYNC_TELEMETRY', '').lower() in ('1', 'true', 'yes')
+        self.stale_after = stale_after
+        self.running = {shard: 0 for shard in SHARDS}
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.stopping = threading.Event()
+        self.threads = []
+
+    @property
+    def pubg_api(self):
+        return self._pubg_api() if callable(self._pubg_api) else self._pubg_api
+
+    def enqueue(self, tournament, match_id):
+        # Returns (job, created). A failed job is re-queued; any other existing job is returned as-is.
+        job = db.session.query(SyncJob).filter_by(tournament_id=tournament.id, match_id=match_id).first()
+        if job is None:
+            job = SyncJob(tournament_id=tournament.id, match_id=match_id, shard=self.pubg_api.get_shard(tournament.platform))
+            db.session.add(job)
+            try:
+                db.session.commit()
+            except IntegrityError:
+                # Someone else queued the same match between our check and insert
+                db.session.rollback()
+                return db.session.query(SyncJob).filter_by(tournament_id=tournament.id, match_id=match_id).one(), False
+            created = True
+        elif job.status == 'failed':
+            job.status = 'queued'
+            job.error = None
+            db.session.commit()
+            created = True
+        else:
+            created = False
+
+        if created and self.workers <= 0:
+            claimed = self._claim_job(job.id)
+            if claimed is not None:
+                self._process(claimed)
+            job = db.session.get(SyncJob, job.id)
+        elif created:
+            self.start()
+            self.wakeup.set()
+        return job, created
+
+    def start(self):
+        if self.workers <= 0:
+            return
+        with self.lock:
+            if self.threads:
+                return
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._run, name=f"sync-worker-{i}", daemon=True)
+                thread.start()
+                self.threads.append(thread)
+        logger.info(f"Started {self.workers} sync workers")
+
+    def stop(self):
+        self.stopping.set()
+        self.wakeup.set()
+        for thread in self.threads:
+            thread.join()
+
+    def requeue_stale(self):
+        # Jobs left 'running' by a crashed process are picked up again
+        cutoff = datetime.utcnow() - timedelta(seconds=self.stale_after)
+        count = db.session.query(SyncJob).filter(SyncJob.status == 'running', SyncJob.started_at < cutoff).update({'status': 'queued'}, synchronize_session=False)
+        db.session.commit()
+        return count
+
+    def _reserve(self, shard):
+        with self.lock:
+            if self.running[shard] >= self.per_shard:
+                return False
+            self.running[shard] += 1
+            return True
+
+    def _release(self, shard):
+        with self.lock:
+            self.running[shard] -= 1
+
+    def _claim(self, shard):
+        candidates = db.session.query(SyncJob.id).filter_by(status='queued', shard=shard).order_by(SyncJob.id).limit(5).all()
+        for (job_id,) in candidates:
+            job = self._claim_job(job_id)
+            if job is not None:
+                return job
+        return None
+
+    def _claim_job(self, job_id):
+        claimed = db.session.query(SyncJob).filter_by(id=job_id, status='queued').update(
+            {'status': 'running', 'started_at': datetime.utcnow(), 'attempts': SyncJob.attempts + 1},
+            synchronize_session=False
+        )
+        db.session.commit()
+        return db.session.get(SyncJob, job_id) if claimed else None
+
+    def run_once(self):
+        # Claim and process at most one job; returns True if a job was processed
+        for shard in SHARDS:
+            if not self._reserve(shard):
+                continue
+            try:
+                job = self._claim(shard)
+                if job is None:
+                    continue
+                self._process(job)
+                return True
+            finally:
+                self._release(shard)
+        return False
+
+    def _process(self, job):
+        tournament = db.session.get(Tournament, job.tournament_id)
+        try:
+            if tournament is None:
+                raise SyncError("Tournament no longer exists.")
+            # Completes the job in the same transaction as the results, so a crash can't re-run it
+            sync_match(self.pubg_api, tournament, job.match_id, telemetry=self.telemetry, job=job)
+            return
+        except MatchAlreadyRecorded:
+            job = db.session.get(SyncJob, job.id)
+            job.status = 'completed'
+            job.error = None
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Sync job {job.id} for match {job.match_id} failed: {e}")
+            job = db.session.get(SyncJob, job.id)
+            job.status = 'failed'
+            job.error = str(e)[:255]
+        job.finished_at = datetime.utcnow()
+        db.session.commit()
+
+    def _run(self):
+        with self.app.app_context():
+            self.requeue_stale()
+            while not self.stopping.is_set():
+                try:
+                    processed = self.run_once()
+                except Exception as e:
+                    db.session.rollback()
+                    logger.error(f"Sync worker error: {e}")
+                    processed = False
+                finally:
+                    db.session.remove()
+                if not processed:
+                    self.wakeup.wait(self.poll_interval)
+                    self.wakeup.clear()
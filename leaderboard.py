@@ -0,0 +1,35 @@
+from sqlalchemy import tuple_
+
+from extensions import db
+from models import User
+
+PLATFORMS = ('Xbox', 'PS5')
+
+def encode_cursor(user, rank):
+    return f"{user.total_wins}.{user.total_kills}.{user.id}.{rank}"
+
+def decode_cursor(cursor):
+    try:
+        wins, kills, user_id, rank = (int(part) for part in cursor.split('.'))
+    except (AttributeError, ValueError):
+        return None
+    return wins, kills, user_id, rank
+
+def get_leaderboard_page(platform=None, cursor=None, per_page=25):
+    # Keyset pagination over the (platform,) total_wins, total_kills, id indexes:
+    # each page seeks straight past the previous page's last row, so deep pages cost the same as page 1.
+    # Returns ([(rank, user), ...], next_cursor or None).
+    query = db.session.query(User)
+    if platform:
+        query = query.filter(User.platform == platform)
+
+    rank = 0
+    position = decode_cursor(cursor) if cursor else None
+    if position:
+        wins, kills, user_id, rank = position
+        query = query.filter(tuple_(User.total_wins, User.total_kills, User.id) < (wins, kills, user_id))
+
+    users = query.order_by(User.total_wins.desc(), User.total_kills.desc(), User.id.desc()).limit(per_page + 1).all()
+    page = [(rank + i, user) for i, user in enumerate(users[:per_page], start=1)]
+    next_cursor = encode_cursor(page[-1][1], page[-1][0]) if len(users) > per_page else None
+    return page, next_cursor
@@ -0,0 +1,209 @@
+import os
+import json
+import queue
+import threading
+import logging
+
+from sqlalchemy import func
+from werkzeug.wsgi import ClosingIterator
+
+from extensions import db
+from models import User, Tournament, TournamentMatch
+
+logger = logging.getLogger(__name__)
+
+class Subscription:
+    def __init__(self, queue_size):
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.needs_snapshot = True
+        self.closed = False
+        self.active = True  # counted against max_streams until unsubscribed
+
+class Channel:
+    # Live state for one tournament: the last standings sent and everyone watching them
+    def __init__(self, tournament_id):
+        self.tournament_id = tournament_id
+        self.subscribers = set()
+        self.marker = None  # (match count, newest TournamentMatch id) the rows below reflect
+        self.rows = {}  # user_id -> standings row with username
+        self.usernames = {}
+        self.seq = 0
+        self.wakeup = threading.Event()
+        self.thread = None
+
+    def snapshot(self):
+        return {
+            'tournament_id': self.tournament_id,
+            'matches': self.marker[0] if self.marker else 0,
+            'standings': sorted(self.rows.values(), key=lambda row: row['rank'])
+        }
+
+class StandingsBroadcaster:
+    # Server-Sent Events for live tournament standings. Each watched tournament gets one poll
+    # loop that checks for new TournamentMatch rows every interval seconds, recomputes the
+    # standings through the StandingsEngine only when there are some, and fans the changed
+    # rows out to every open stream. Streams themselves never touch the database.
+    # An interval of 0 (serverless, no background threads) sends one snapshot per connection
+    # and lets the browser's EventSource reconnect after RECONNECT_MS.
+    # Every open stream holds a worker thread, so a process keeps at most max_streams open;
+    # past that, viewers get the same one-snapshot-and-reconnect treatment, i.e. they poll.
+    RECONNECT_MS = 5000
+    KEEPALIVE_SECONDS = 15
+
+    def __init__(self, app, engine, interval=None, queue_size=64, max_streams=None):
+        # engine is a StandingsEngine, or a zero-argument loader returning it
+        self.app = app
+        self._engine = engine
+        if interval is None:
+            interval = float(os.environ.get('LIVE_STANDINGS_INTERVAL', 0 if os.environ.get('VERCEL') else 2))
+        self.interval = interval
+        self.queue_size = queue_size
+        if max_streams is None:
+            max_streams = int(os.environ.get('LIVE_STANDINGS_MAX_STREAMS', 32))
+        self.max_streams = max_streams
+        self.streams = 0
+        self.channels = {}
+        self.lock = threading.Lock()
+
+    @property
+    def engine(self):
+        return self._engine() if callable(self._engine) else self._engine
+
+    def subscribe(self, tournament_id):
+        # Returns None when the process already has max_streams open
+        subscription = Subscription(self.queue_size)
+        with self.lock:
+            if self.streams >= self.max_streams:
+                return None
+            self.streams += 1
+            channel = self.channels.get(tournament_id)
+            if channel is None:
+                channel = self.channels[tournament_id] = Channel(tournament_id)
+            channel.subscribers.add(subscription)
+            if channel.thread is None:
+                channel.thread = threading.Thread(target=self._run, args=(channel,), name=f"standings-{tournament_id}", daemon=True)
+                channel.thread.start()
+        channel.wakeup.set()
+        return subscription
+
+    def unsubscribe(self, tournament_id, subscription):
+        with self.lock:
+            if subscription.active:
+                subscription.active = False
+                self.streams -= 1
+            channel = self.channels.get(tournament_id)
+            if channel is not None:
+                channel.subscribers.discard(subscription)
+                if not channel.subscribers:
+                    channel.wakeup.set()
+
+    def stream(self, tournament_id):
+        # Body of a text/event-stream response; call it from the request
+        subscription = self.subscribe(tournament_id) if self.interval > 0 else None
+        if subscription is None:
+            with self.lock:
+                channel = self.channels.get(tournament_id)
+            if channel is None or channel.marker is None:
+                channel = Channel(tournament_id)
+                self.refresh(channel)
+            return iter([f"retry: {self.RECONNECT_MS}\n", self._event('snapshot', channel.seq, channel.snapshot())])
+        # Closing the response releases the slot even if the body was never iterated
+        return ClosingIterator(self._listen(tournament_id, subscription), lambda: self.unsubscribe(tournament_id, subscription))
+
+    def _listen(self, tournament_id, subscription):
+        try:
+            yield f"retry: {self.RECONNECT_MS}\n\n"
+            while True:
+                try:
+                    event = subscription.queue.get(timeout=self.KEEPALIVE_SECONDS)
+                except queue.Empty:
+                    if subscription.closed:
+                        return
+                    yield ": keepalive\n\n"
+                    continue
+                if event is None or subscription.closed:
+                    # Dropped for falling behind; the browser reconnects and starts from a snapshot
+                    return
+                yield self._event(*event)
+        finally:
+            self.unsubscribe(tournament_id, subscription)
+
+    def refresh(self, channel):
+        # Recompute channel.rows if the tournament has new matches; returns the changed rows
+        # (and removed user ids), or None when nothing changed. Needs an app context.
+        marker = tuple(db.session.query(func.count(TournamentMatch.id), func.max(TournamentMatch.id)).filter(
+            TournamentMatch.tournament_id == channel.tournament_id).one())
+        if marker == channel.marker:
+            return None
+        tournament = db.session.get(Tournament, channel.tournament_id)
+        if tournament is None:
+            return None
+
+        standings = self.engine.standings(tournament)
+        unknown = [row['user_id'] for row in standings if row['user_id'] not in channel.usernames]
+        if unknown:
+            channel.usernames.update(db.session.query(User.id, User.username).filter(User.id.in_(unknown)).all())
+        rows = {row['user_id']: dict(row, username=channel.usernames.get(row['user_id'])) for row in standings}
+
+        # Clients already know the usernames of players they've seen
+        changed = [
+            row if user_id not in channel.rows else {key: value for key, value in row.items() if key != 'username'}
+            for user_id, row in rows.items() if channel.rows.get(user_id) != row
+        ]
+        removed = [user_id for user_id in channel.rows if user_id not in rows]
+        channel.rows = rows
+        channel.marker = marker
+        channel.seq += 1
+        return changed, removed
+
+    def _event(self, kind, seq, data):
+        return f"id: {seq}\nevent: {kind}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+    def _publish(self, channel, subscription, event):
+        try:
+            subscription.queue.put_nowait(event)
+        except queue.Full:
+            subscription.closed = True
+            with self.lock:
+                channel.subscribers.discard(subscription)
+            # Swap the stale backlog for the sentinel so the stream ends (and frees its slot) right away
+            while True:
+                try:
+                    subscription.queue.get_nowait()
+                except queue.Empty:
+                    break
+            subscription.queue.put_nowait(None)
+
+    def _run(self, channel):
+        with self.app.app_context():
+            while True:
+                channel.wakeup.clear()
+                with self.lock:
+                    if not channel.subscribers:
+                        # Last viewer left; a new one starts a fresh channel
+                        del self.channels[channel.tournament_id]
+                        return
+                    subscribers = list(channel.subscribers)
+                try:
+                    delta = self.refresh(channel)
+                except Exception as e:
+                    logger.error(f"Live standings poll for tournament {channel.tournament_id} failed: {e}")
+                    delta = None
+                finally:
+                    db.session.remove()
+
+                for subscription in subscribers:
+                    if subscription.needs_snapshot:
+                        if channel.marker is not None:
+                            subscription.needs_snapshot = False
+                            self._publish(channel, subscription, ('snapshot', channel.seq, channel.snapshot()))
+                    elif delta is not None:
+                        changed, removed = delta
+                        self._publish(channel, subscription, ('delta', channel.seq, {
+                            'matches': channel.marker[0],
+                            'players': len(channel.rows),
+                            'rows': changed,
+                            'removed': removed
+                        }))
+
+                channel.wakeup.wait(self.interval)
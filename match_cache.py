@@ -0,0 +1,88 @@
+import os
+import re
+import gzip
+import json
+import tempfile
+import threading
+import logging
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+# Match IDs are UUIDs; anything else never touches the filesystem
+SAFE_KEY = re.compile(r'^[A-Za-z0-9_-]+$')
+
+class MatchCache:
+    # Finished matches never change, so documents are cached forever:
+    # a bounded in-process LRU in front of gzip-compressed JSON files on disk
+    def __init__(self, cache_dir=None, max_entries=64):
+        self.cache_dir = cache_dir or os.environ.get('PUBG_MATCH_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'pubg_match_cache'))
+        self.max_entries = max_entries
+        self.memory = OrderedDict()
+        self.lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _path(self, shard, match_id):
+        if not SAFE_KEY.match(shard) or not SAFE_KEY.match(match_id):
+            return None
+        return os.path.join(self.cache_dir, shard, f"{match_id}.json.gz")
+
+    def _remember(self, key, match_data):
+        with self.lock:
+            self.memory[key] = match_data
+            self.memory.move_to_end(key)
+            while len(self.memory) > self.max_entries:
+                self.memory.popitem(last=False)
+
+    def get(self, shard, match_id):
+        key = (shard, match_id)
+        with self.lock:
+            if key in self.memory:
+                self.memory.move_to_end(key)
+                self.memory_hits += 1
+                return self.memory[key]
+
+        path = self._path(shard, match_id)
+        if path and os.path.exists(path):
+            try:
+                with gzip.open(path, 'rt', encoding='utf-8') as f:
+                    match_data = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Discarding unreadable cached match {match_id}: {e}")
+            else:
+                self._remember(key, match_data)
+                with self.lock:
+                    self.disk_hits += 1
+                return match_data
+
+        with self.lock:
+            self.misses += 1
+        return None
+
+    def set(self, shard, match_id, match_data):
+        self._remember((shard, match_id), match_data)
+        path = self._path(shard, match_id)
+        if not path:
+            return
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write to a temp file first so concurrent readers never see a partial document
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+            with os.fdopen(fd, 'wb') as raw, gzip.GzipFile(fileobj=raw, mode='wb') as f:
+                f.write(json.dumps(match_data, separators=(',', ':')).encode('utf-8'))
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Could not write match {match_id} to disk cache: {e}")
+
+    def stats(self):
+        with self.lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                'memory_hits': self.memory_hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'hit_rate': (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+                'memory_entries': len(self.memory)
+            }
@@ -0,0 +1,187 @@
+import os
+import time
+import logging
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+
+from flask import request, Response, abort, has_request_context
+
+logger = logging.getLogger(__name__)
+
+# Off by default: when disabled no hooks or engine listeners are installed at all
+ENABLED = os.environ.get('METRICS_ENABLED', '').lower() in ('1', 'true', 'yes')
+SLOW_REQUEST_MS = float(os.environ.get('SLOW_REQUEST_MS', 500))
+# Slowest statements kept per request for the slow-request log
+MAX_LOGGED_QUERIES = 5
+
+_lock = threading.Lock()
+_local = threading.local()
+_requests = defaultdict(lambda: {'count': 0, 'seconds': 0.0, 'sql_count': 0, 'sql_seconds': 0.0})
+_statuses = defaultdict(int)  # (endpoint, method, status) -> count
+_outbound = defaultdict(lambda: {'count': 0, 'errors': 0, 'seconds': 0.0})  # (endpoint, service) -> stats
+_caches = {}
+
+@contextmanager
+def outbound(service):
+    # Times a call to an external API (pubg, paypal); a no-op unless metrics are enabled
+    if not ENABLED:
+        yield
+        return
+    start = time.perf_counter()
+    failed = False
+    try:
+        yield
+    except Exception:
+        failed = True
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        endpoint = (request.endpoint or 'unknown') if has_request_context() else 'background'
+        with _lock:
+            stats = _outbound[(endpoint, service)]
+            stats['count'] += 1
+            stats['seconds'] += elapsed
+            if failed:
+                stats['errors'] += 1
+
+def register_cache(name, stats):
+    # stats() returns a dict with 'hits' and 'misses', or None if the cache isn't built yet
+    _caches[name] = stats
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_start', []).append(time.perf_counter())
+    if context is not None:
+        context._metrics_started = True
+
+def _handle_error(context):
+    # A statement that raises never reaches _after_cursor_execute; drop its start time here
+    execution = context.execution_context
+    if getattr(execution, '_metrics_started', False) and context.connection is not None:
+        starts = context.connection.info.get('query_start')
+        if starts:
+            starts.pop()
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info['query_start'].pop()
+    current = getattr(_local, 'request', None)
+    if current is None:
+        # Background workers and CLI commands
+        with _lock:
+            stats = _requests['background']
+            stats['sql_count'] += 1
+            stats['sql_seconds'] += elapsed
+        return
+    current['sql_count'] += 1
+    current['sql_seconds'] += elapsed
+    queries = current['queries']
+    queries.append((elapsed, statement))
+    if len(queries) > MAX_LOGGED_QUERIES:
+        queries.remove(min(queries, key=lambda q: q[0]))
+
+def _start_request():
+    _local.request = {'start': time.perf_counter(), 'sql_count': 0, 'sql_seconds': 0.0, 'queries': []}
+
+def _finish_request(response):
+    current = getattr(_local, 'request', None)
+    _local.request = None
+    if current is None:
+        return response
+    elapsed = time.perf_counter() - current['start']
+    endpoint = request.endpoint or 'unknown'
+    with _lock:
+        stats = _requests[endpoint]
+        stats['count'] += 1
+        stats['seconds'] += elapsed
+        stats['sql_count'] += current['sql_count']
+        stats['sql_seconds'] += current['sql_seconds']
+        _statuses[(endpoint, request.method, response.status_code)] += 1
+
+    if elapsed * 1000 >= SLOW_REQUEST_MS:
+        slowest = sorted(current['queries'], key=lambda q: q[0], reverse=True)
+        details = ''.join(f"\n  {seconds * 1000:.1f} ms: {' '.join(statement.split())[:300]}" for seconds, statement in slowest)
+        logger.warning(
+            f"Slow request {request.method} {request.path} ({endpoint}): {elapsed * 1000:.0f} ms, "
+            f"{current['sql_count']} queries in {current['sql_seconds'] * 1000:.0f} ms{details}"
+        )
+    return response
+
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def render():
+    lines = []
+
+    def metric(name, kind, help_text, samples):
+        # samples are (labels, value), or (suffix, labels, value) for summaries
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for sample in samples:
+            suffix, labels, value = sample if len(sample) == 3 else ('', *sample)
+            label_text = ','.join(f'{key}="{_label(val)}"' for key, val in labels.items())
+            lines.append(f"{name}{suffix}{{{label_text}}} {value}")
+
+    with _lock:
+        requests_snapshot = {endpoint: dict(stats) for endpoint, stats in _requests.items()}
+        statuses_snapshot = dict(_statuses)
+        outbound_snapshot = {key: dict(stats) for key, stats in _outbound.items()}
+
+    metric('http_requests_total', 'counter', 'Requests handled, by endpoint, method and status.',
+           [({'endpoint': e, 'method': m, 'status': s}, count) for (e, m, s), count in sorted(statuses_snapshot.items())])
+    timed = [(e, stats) for e, stats in sorted(requests_snapshot.items()) if e != 'background']
+    metric('http_request_duration_seconds', 'summary', 'Wall time spent handling requests, by endpoint.',
+           [sample for e, stats in timed for sample in (
+               ('_sum', {'endpoint': e}, f"{stats['seconds']:.6f}"),
+               ('_count', {'endpoint': e}, stats['count'])
+           )])
+    metric('sql_queries_total', 'counter', 'SQL statements executed, by endpoint ("background" for workers).',
+           [({'endpoint': e}, stats['sql_count']) for e, stats in sorted(requests_snapshot.items())])
+    metric('sql_query_duration_seconds_total', 'counter', 'Time spent in SQL statements, by endpoint.',
+           [({'endpoint': e}, f"{stats['sql_seconds']:.6f}") for e, stats in sorted(requests_snapshot.items())])
+    calls = sorted(outbound_snapshot.items())
+    metric('outbound_requests_total', 'counter', 'Calls to external APIs, by endpoint and service.',
+           [({'endpoint': e, 'service': s}, stats['count']) for (e, s), stats in calls])
+    metric('outbound_request_errors_total', 'counter', 'Calls to external APIs that raised, by endpoint and service.',
+           [({'endpoint': e, 'service': s}, stats['errors']) for (e, s), stats in calls])
+    metric('outbound_request_duration_seconds_total', 'counter', 'Time spent calling external APIs, by endpoint and service.',
+           [({'endpoint': e, 'service': s}, f"{stats['seconds']:.6f}") for (e, s), stats in calls])
+
+    cache_stats = {}
+    for name, stats in sorted(_caches.items()):
+        try:
+            value = stats()
+        except Exception as e:
+            logger.warning(f"Could not read stats for cache {name}: {e}")
+            continue
+        if value is not None:
+            cache_stats[name] = value
+    metric('cache_hits_total', 'counter', 'Cache lookups served from cache.',
+           [({'cache': name}, value['hits']) for name, value in cache_stats.items()])
+    metric('cache_misses_total', 'counter', 'Cache lookups that missed.',
+           [({'cache': name}, value['misses']) for name, value in cache_stats.items()])
+    return '\n'.join(lines) + '\n'
+
+def init_app(app):
+    if not ENABLED:
+        return
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+
+    # Process-wide, so only the first app built registers them
+    if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+        event.listen(Engine, 'handle_error', _handle_error)
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
+    # Requests that raise skip after_request; don't let their state leak into the next one
+    app.teardown_request(lambda exc: setattr(_local, 'request', None))
+
+    token = os.environ.get('METRICS_TOKEN')
+
+    def metrics_view():
+        if token and request.headers.get('Authorization') != f"Bearer {token}":
+            abort(401)
+        return Response(render(), mimetype='text/plain; version=0.0.4')
+
+    app.add_url_rule('/metrics', 'metrics', metrics_view)
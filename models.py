@@ -4,7 +4,17 @@ from datetime import datetime
 
 from werkzeug.security import generate_password_hash, check_password_hash
 
+def is_xbox(platform):
+    # Tournaments say 'Xbox Series', users 'Xbox'; anything else plays on the PSN shard
+    return (platform or '').lower().startswith('xbox')
+
 class User(UserMixin, db.Model):
+    # Back the leaderboard's keyset pagination, overall and per platform
+    __table_args__ = (
+        db.Index('ix_user_leaderboard', 'total_wins', 'total_kills', 'id'),
+        db.Index('ix_user_platform_leaderboard', 'platform', 'total_wins', 'total_kills', 'id'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(80), unique=True, nullable=False)
     email = db.Column(db.String(120), unique=True, nullable=False)
@@ -13,11 +23,16 @@ class User(UserMixin, db.Model):
     platform = db.Column(db.String(20), nullable=False) # PS5 or Xbox Series
     xbox_gamertag = db.Column(db.String(80), nullable=True)
     psn_id = db.Column(db.String(80), nullable=True)
+    # PUBG account IDs resolved from the gamertags above, cached so stat syncs skip the lookup
+    xbox_account_id = db.Column(db.String(100), nullable=True)
+    psn_account_id = db.Column(db.String(100), nullable=True)
     xbox_oauth_id = db.Column(db.String(100), nullable=True, unique=True)
     psn_oauth_id = db.Column(db.String(100), nullable=True, unique=True)
     balance = db.Column(db.Float, default=0.0)
     total_kills = db.Column(db.Integer, default=0)
     total_wins = db.Column(db.Integer, default=0)
+    # Bumped with every change to the row, so cached copies (user_cache.py) can tell they are stale
+    version = db.Column(db.Integer, nullable=False, default=0)
 
     def set_password(self, password):
         self.password_hash = generate_password_hash(password)
@@ -25,7 +40,25 @@ class User(UserMixin, db.Model):
     def check_password(self, password):
         return check_password_hash(self.password_hash, password)
 
+    def gamertag_for(self, platform):
+        return self.xbox_gamertag if is_xbox(platform) else self.psn_id
+
+    def account_id_for(self, platform):
+        return self.xbox_account_id if is_xbox(platform) else self.psn_account_id
+
+    def set_account_id(self, platform, account_id):
+        if is_xbox(platform):
+            self.xbox_account_id = account_id
+        else:
+            self.psn_account_id = account_id
+
 class Tournament(db.Model):
+    # Back the tournaments listing's keyset pagination, with and without a status filter
+    __table_args__ = (
+        db.Index('ix_tournament_date', 'date', 'id'),
+        db.Index('ix_tournament_status_date', 'status', 'date', 'id'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(100), nullable=False)
     description = db.Column(db.Text, nullable=True)
@@ -36,6 +69,9 @@ class Tournament(db.Model):
     platform = db.Column(db.String(20), nullable=False) # PS5, Xbox Series, or Crossplay
     status = db.Column(db.String(20), default='upcoming') # upcoming, ongoing, completed
     max_players = db.Column(db.Integer, default=100)
+    slots_taken = db.Column(db.Integer, default=0) # Registrations holding a slot, maintained by registrations.py
+    # Optional point table override, e.g. {"placement_points": {"1": 10, "2": 6}, "kill_points": 1}
+    scoring = db.Column(db.JSON, nullable=True)
     matches = db.relationship('TournamentMatch', backref='tournament', lazy=True)
 
     @property
@@ -57,30 +93,128 @@ class Sponsor(db.Model):
     contribution_type = db.Column(db.String(50)) # e.g., 'Per View', 'Direct Credit'
 
 class TournamentMatch(db.Model):
+    # A PUBG match is recorded at most once per tournament, whichever path syncs it
+    __table_args__ = (db.UniqueConstraint('tournament_id', 'match_id', name='uq_tournament_match'),)
+
     id = db.Column(db.Integer, primary_key=True)
-    tournament_id = db.Column(db.Integer, db.ForeignKey('tournament.id'), nullable=False)
+    tournament_id = db.Column(db.Integer, db.ForeignKey('tournament.id'), nullable=False, index=True)
     match_id = db.Column(db.String(100), nullable=True) # PUBG API Match ID
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
     results = db.relationship('MatchResult', backref='match', lazy=True)
 
 class MatchResult(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    match_id = db.Column(db.Integer, db.ForeignKey('tournament_match.id'), nullable=False)
+    match_id = db.Column(db.Integer, db.ForeignKey('tournament_match.id'), nullable=False, index=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     kills = db.Column(db.Integer, default=0)
     placement = db.Column(db.Integer, default=0)
     win = db.Column(db.Boolean, default=False)
+    # Aggregates from the match telemetry, when it was synced
+    damage_dealt = db.Column(db.Float, default=0.0)
+    damage_taken = db.Column(db.Float, default=0.0)
+    knocks = db.Column(db.Integer, default=0)
+    headshot_kills = db.Column(db.Integer, default=0)
+    longest_kill = db.Column(db.Float, default=0.0) # metres
+    timeline = db.Column(db.JSON, nullable=True) # [[seconds, 'knock' | 'kill' | 'death', other account id], ...]
 
 class Registration(db.Model):
+    __table_args__ = (db.UniqueConstraint('user_id', 'tournament_id', name='uq_registration_user_tournament'),)
+
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-    tournament_id = db.Column(db.Integer, db.ForeignKey('tournament.id'), nullable=False)
+    tournament_id = db.Column(db.Integer, db.ForeignKey('tournament.id'), nullable=False, index=True)
+    status = db.Column(db.String(20), default='registered') # registered, waitlisted
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
 
 class Payout(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     amount = db.Column(db.Float, nullable=False)
-    status = db.Column(db.String(20), default='pending') # pending, completed, failed
+    status = db.Column(db.String(20), default='pending', index=True) # pending, submitted, completed, failed, review
+    # PayPal email captured when the payout was requested, so later profile edits can't redirect or block it
+    receiver = db.Column(db.String(120), nullable=True)
     paypal_transaction_id = db.Column(db.String(100), nullable=True)
+    # Set when the payout is claimed into a PayPal batch; PayPal rejects a reused
+    # sender_batch_id, so resubmitting the same batch can never pay twice
+    sender_batch_id = db.Column(db.String(64), nullable=True, index=True)
+    payout_batch_id = db.Column(db.String(64), nullable=True, index=True) # PayPal's ID for the batch
+    error = db.Column(db.String(255), nullable=True)
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
+
+class SyncJob(db.Model):
+    # One row per (tournament, PUBG match); the unique constraint keeps a match from being ingested twice
+    __table_args__ = (db.UniqueConstraint('tournament_id', 'match_id', name='uq_sync_job_tournament_match'),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    tournament_id = db.Column(db.Integer, db.ForeignKey('tournament.id'), nullable=False)
+    match_id = db.Column(db.String(100), nullable=False) # PUBG API Match ID
+    shard = db.Column(db.String(20), nullable=False) # xbox or psn
+    status = db.Column(db.String(20), default='queued', index=True) # queued, running, completed, failed
+    error = db.Column(db.String(255), nullable=True)
+    attempts = db.Column(db.Integer, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'tournament_id': self.tournament_id,
+            'match_id': self.match_id,
+            'status': self.status,
+            'error': self.error,
+            'attempts': self.attempts,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+
+class StatTotals:
+    # Counters shared by the stat rollups, maintained by player_stats.py
+    matches = db.Column(db.Integer, nullable=False, default=0)
+    kills = db.Column(db.Integer, nullable=False, default=0)
+    wins = db.Column(db.Integer, nullable=False, default=0)
+    top10 = db.Column(db.Integer, nullable=False, default=0)
+    # PUBG reports placement 0 when it doesn't know it; placed counts the matches with a real one,
+    # and only those go into placement_total and best_placement
+    placed = db.Column(db.Integer, nullable=False, default=0)
+    placement_total = db.Column(db.Integer, nullable=False, default=0)
+    best_placement = db.Column(db.Integer, nullable=True)
+    damage_dealt = db.Column(db.Float, nullable=False, default=0.0)
+    knocks = db.Column(db.Integer, nullable=False, default=0)
+    headshot_kills = db.Column(db.Integer, nullable=False, default=0)
+    longest_kill = db.Column(db.Float, nullable=False, default=0.0)
+
+    @property
+    def kd(self):
+        # PUBG convention: every match you don't win ends in a death
+        deaths = self.matches - self.wins
+        return self.kills / deaths if deaths else float(self.kills)
+
+    @property
+    def avg_placement(self):
+        return self.placement_total / self.placed if self.placed else None
+
+class TournamentPlayerStats(StatTotals, db.Model):
+    # One row per player per tournament they have results in
+    __table_args__ = (db.UniqueConstraint('user_id', 'tournament_id', name='uq_tournament_player_stats'),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    tournament_id = db.Column(db.Integer, db.ForeignKey('tournament.id'), nullable=False, index=True)
+
+class PlayerStats(StatTotals, db.Model):
+    # One row per player per period ('all' or a season like '2026-Q3') per tournament platform
+    __table_args__ = (db.UniqueConstraint('user_id', 'period', 'platform', name='uq_player_stats'),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    period = db.Column(db.String(10), nullable=False)
+    platform = db.Column(db.String(20), nullable=False)
+    tournaments = db.Column(db.Integer, nullable=False, default=0)
+
+class DataVersion(db.Model):
+    # Single row bumped whenever data shown on the public pages changes; feeds their ETags
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
@@ -0,0 +1,266 @@
+import os
+import re
+import json
+import uuid
+import threading
+import logging
+
+from sqlalchemy import update
+
+from extensions import db
+from models import User, Payout
+from metrics import outbound
+import user_cache
+
+logger = logging.getLogger(__name__)
+
+# PayPal item statuses that mean the money did not arrive and goes back to the user's balance
+FAILED_STATUSES = ('FAILED', 'RETURNED', 'BLOCKED', 'REFUNDED', 'REVERSED', 'DENIED')
+
+# PayPal error names where resubmitting the same batch later can succeed; any other error is final
+RETRYABLE_ERRORS = ('INTERNAL_ERROR', 'INTERNAL_SERVER_ERROR', 'SERVICE_UNAVAILABLE', 'RATE_LIMIT_REACHED', 'INSUFFICIENT_FUNDS')
+
+def parse_error(content):
+    try:
+        return json.loads(content) if content else None
+    except (TypeError, ValueError):
+        return None
+
+def describe_error(error):
+    error = error or {}
+    return f"{error.get('name', 'ERROR')}: {error.get('message', '')}".strip()
+
+def is_duplicate_batch(error):
+    error = error or {}
+    message = (error.get('message') or '').lower()
+    return error.get('name') == 'DUPLICATE_REQUEST_ID' or ('sender_batch_id' in message and 'already exist' in message)
+
+def invalid_items(error):
+    # Indexes of the items a validation error blames, from details like {"field": "items[3].receiver"}
+    indexes = set()
+    for detail in (error or {}).get('details') or []:
+        match = re.match(r'items\[(\d+)\]', detail.get('field') or '')
+        if match:
+            indexes.add(int(match.group(1)))
+    return indexes
+
+class PayoutBatcher:
+    # Sends pending Payout rows to PayPal as batch payouts (up to batch_size items per call)
+    # and polls the batches until every item settles. Runs on a background thread every
+    # interval seconds, or once per `flask process-payouts` where threads aren't available.
+    def __init__(self, app, paypal, interval=None, batch_size=500):
+        # paypal is the configured paypalrestsdk module (or a stand-in), or a zero-argument loader returning it
+        self.app = app
+        self._paypal = paypal
+        if interval is None:
+            interval = float(os.environ.get('PAYOUT_BATCH_INTERVAL', 0 if os.environ.get('VERCEL') else 60))
+        self.interval = interval
+        self.batch_size = batch_size
+        self.lock = threading.Lock()
+        self.thread = None
+        self.wakeup = threading.Event()
+        self.stopping = threading.Event()
+
+    @property
+    def paypal(self):
+        return self._paypal() if callable(self._paypal) else self._paypal
+
+    def wake(self):
+        if self.interval <= 0:
+            return
+        with self.lock:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, name='payout-batcher', daemon=True)
+                self.thread.start()
+        self.wakeup.set()
+
+    def run_once(self):
+        submitted = self.submit_pending()
+        settled = self.poll_submitted()
+        return submitted, settled
+
+    def submit_pending(self):
+        # Retry batches that were claimed but never acknowledged, then claim new ones
+        in_flight = [row.sender_batch_id for row in db.session.query(Payout.sender_batch_id).filter(
+            Payout.status == 'pending', Payout.sender_batch_id.isnot(None)).distinct()]
+        submitted = sum(self._submit(sender_batch_id) for sender_batch_id in in_flight)
+
+        while True:
+            sender_batch_id = self._claim()
+            if sender_batch_id is None:
+                break
+            submitted += self._submit(sender_batch_id)
+        return submitted
+
+    def _claim(self):
+        ids = db.session.query(Payout.id).filter(Payout.status == 'pending', Payout.sender_batch_id.is_(None)).order_by(Payout.id).limit(self.batch_size).subquery()
+        sender_batch_id = f"batch_{uuid.uuid4().hex}"
+        # Conditional so two batchers can never put the same payout in different batches
+        claimed = db.session.execute(
+            update(Payout)
+            .where(Payout.id.in_(db.select(ids.c.id)), Payout.sender_batch_id.is_(None))
+            .values(sender_batch_id=sender_batch_id)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        db.session.commit()
+        return sender_batch_id if claimed else None
+
+    def _submit(self, sender_batch_id):
+        rows = db.session.query(Payout, User.paypal_email).join(User, Payout.user_id == User.id).filter(
+            Payout.sender_batch_id == sender_batch_id, Payout.status == 'pending').order_by(Payout.id).all()
+        refunded = []
+        # Payouts requested before receivers were stored on them fall back to the profile email
+        for row, paypal_email in rows:
+            if not row.receiver:
+                row.receiver = paypal_email
+                if not row.receiver:
+                    self._fail(row.id, "No PayPal email on file.", refunded)
+        rows = [row for row, _ in rows if row.receiver]
+        if not rows:
+            db.session.commit()
+            user_cache.invalidate(*refunded)
+            return 0
+
+        payout = self.paypal.Payout({
+            "sender_batch_header": {
+                "sender_batch_id": sender_batch_id,
+                "email_subject": "You have a tournament payout!"
+            },
+            "items": [
+                {
+                    "recipient_type": "EMAIL",
+                    "amount": {
+                        "value": f"{row.amount:.2f}",
+                        "currency": "USD"
+                    },
+                    "receiver": row.receiver,
+                    "note": "Thank you for participating in PUBG Console Arena! Your payout includes donation funds and sponsor credits.",
+                    "sender_item_id": f"payout_{row.id}"
+                }
+                for row in rows
+            ]
+        })
+
+        try:
+            with outbound('paypal'):
+                created = payout.create()
+            error = payout.error
+        except Exception as e:
+            # The SDK returns 400s as payout.error but raises for other statuses. Conflicts and
+            # validation errors are answers about this batch; anything else (5xx, network) is retried.
+            status = getattr(getattr(e, 'response', None), 'status_code', None)
+            if status not in (409, 422):
+                raise
+            created, error = False, parse_error(getattr(e, 'content', None)) or {'message': str(e)}
+
+        count = 0
+        if created:
+            payout_batch_id = payout.to_dict().get('batch_header', {}).get('payout_batch_id')
+            self._mark(sender_batch_id, status='submitted', payout_batch_id=payout_batch_id, error=None)
+            count = len(rows)
+        elif is_duplicate_batch(error):
+            # An earlier attempt went through but its response was lost. PayPal can't look a batch
+            # up by sender_batch_id, so park the rows until `flask resolve-payout-batch` links them.
+            logger.error(f"PayPal batch {sender_batch_id} already exists, payouts need review")
+            self._mark(sender_batch_id, status='review', error=f"Batch already exists at PayPal: {describe_error(error)}"[:255])
+        elif (error or {}).get('name') in RETRYABLE_ERRORS:
+            # Leave the rows claimed so the next run resubmits the same sender_batch_id
+            logger.warning(f"PayPal batch {sender_batch_id} failed, will retry: {describe_error(error)}")
+            self._mark(sender_batch_id, error=describe_error(error)[:255])
+        else:
+            logger.error(f"PayPal rejected batch {sender_batch_id}: {describe_error(error)}")
+            bad = {rows[i].id for i in invalid_items(error) if i < len(rows)}
+            for row in rows:
+                if not bad or row.id in bad:
+                    self._fail(row.id, describe_error(error), refunded)
+            # The rest go back in the queue and get a fresh batch on the next claim
+            self._mark(sender_batch_id, sender_batch_id=None, error=None)
+        db.session.commit()
+        user_cache.invalidate(*refunded)
+        return count
+
+    def _mark(self, batch_id, **values):
+        # Update the batch's payouts that are still pending
+        db.session.execute(
+            update(Payout).where(Payout.sender_batch_id == batch_id, Payout.status == 'pending').values(**values)
+            .execution_options(synchronize_session=False)
+        )
+
+    def _fail(self, payout_id, message, refunded):
+        # A pending payout that can never be sent: mark it failed and give the money back
+        moved = db.session.execute(
+            update(Payout).where(Payout.id == payout_id, Payout.status == 'pending').values(status='failed', error=message[:255])
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        if moved:
+            self._refund(payout_id, refunded)
+
+    def _refund(self, payout_id, refunded):
+        payout = db.session.get(Payout, payout_id)
+        db.session.execute(update(User).where(User.id == payout.user_id).values(balance=User.balance + payout.amount, version=User.version + 1))
+        refunded.append(payout.user_id)
+
+    def resolve(self, sender_batch_id, payout_batch_id):
+        # Link payouts held for review to the PayPal batch they went out in, so polling settles them
+        count = db.session.execute(
+            update(Payout).where(Payout.sender_batch_id == sender_batch_id, Payout.status == 'review')
+            .values(status='submitted', payout_batch_id=payout_batch_id, error=None)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        db.session.commit()
+        return count
+
+    def poll_submitted(self):
+        batch_ids = [row.payout_batch_id for row in db.session.query(Payout.payout_batch_id).filter(Payout.status == 'submitted').distinct()]
+        settled = 0
+        refunded = []
+        for payout_batch_id in batch_ids:
+            try:
+                with outbound('paypal'):
+                    batch = self.paypal.Payout.find(payout_batch_id)
+            except Exception as e:
+                logger.warning(f"Could not fetch PayPal batch {payout_batch_id}: {e}")
+                continue
+            for item in batch.to_dict().get('items', []):
+                settled += self._settle(item, refunded)
+            db.session.commit()
+            user_cache.invalidate(*refunded)
+        return settled
+
+    def _settle(self, item, refunded):
+        sender_item_id = item.get('payout_item', {}).get('sender_item_id', '')
+        if not sender_item_id.startswith('payout_'):
+            return 0
+        payout_id = int(sender_item_id[len('payout_'):])
+        status = item.get('transaction_status')
+
+        if status == 'SUCCESS':
+            values = {'status': 'completed', 'paypal_transaction_id': item.get('transaction_id')}
+        elif status in FAILED_STATUSES:
+            errors = item.get('errors') or {}
+            values = {'status': 'failed', 'error': (errors.get('message') or status)[:255]}
+        else:
+            # PENDING, UNCLAIMED, ONHOLD...: check again next run
+            return 0
+
+        # Only the transition out of 'submitted' counts, so re-polling never refunds twice
+        moved = db.session.execute(
+            update(Payout).where(Payout.id == payout_id, Payout.status == 'submitted').values(**values)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        if moved and values['status'] == 'failed':
+            self._refund(payout_id, refunded)
+        return moved
+
+    def _run(self):
+        with self.app.app_context():
+            while not self.stopping.is_set():
+                try:
+                    self.run_once()
+                except Exception as e:
+                    db.session.rollback()
+                    logger.error(f"Payout batcher error: {e}")
+                finally:
+                    db.session.remove()
+                self.wakeup.wait(self.interval)
+                self.wakeup.clear()
@@ -0,0 +1,195 @@
+from datetime import datetime
+
+from sqlalchemy import select, insert, delete, bindparam, case, literal, func, and_
+from sqlalchemy.exc import IntegrityError
+
+from extensions import db
+from models import Tournament, TournamentMatch, MatchResult, Registration, TournamentPlayerStats, PlayerStats
+
+# Rollups are kept per tournament and per (user, period, tournament platform), where the
+# period is ALL_TIME or the calendar quarter of the tournament date. record_results keeps
+# them current as matches are synced; rebuild() recomputes them from MatchResult.
+ALL_TIME = 'all'
+
+# MatchResult column -> bind parameter carrying the per-match increment
+SUMS = {
+    'kills': 'b_kills',
+    'wins': 'b_wins',
+    'top10': 'b_top10',
+    'placed': 'b_placed',
+    'placement_total': 'b_placement',
+    'damage_dealt': 'b_damage',
+    'knocks': 'b_knocks',
+    'headshot_kills': 'b_headshots',
+}
+
+def season_for(date):
+    return f"{date.year}-Q{(date.month - 1) // 3 + 1}"
+
+def season_bounds(season):
+    year, quarter = int(season[:4]), int(season[-1])
+    start = datetime(year, 3 * quarter - 2, 1)
+    end = datetime(year + 1, 1, 1) if quarter == 4 else datetime(year, 3 * quarter + 1, 1)
+    return start, end
+
+def _ensure_rows(model, key_columns, keys):
+    # Insert zeroed rows for the keys that don't exist yet and return the ones this call created
+    table = model.__table__
+    columns = [table.c[name] for name in key_columns]
+    remaining = set(keys)
+    for attempt in range(3):
+        # Per-column IN lists can use the unique index, a row-value IN can't on SQLite
+        query = select(*columns).where(*(column.in_({key[i] for key in remaining}) for i, column in enumerate(columns)))
+        missing = remaining - {tuple(row) for row in db.session.execute(query)}
+        if not missing:
+            return set()
+        try:
+            with db.session.begin_nested():
+                db.session.execute(insert(model), [dict(zip(key_columns, key)) for key in sorted(missing)])
+            return missing
+        except IntegrityError:
+            # A concurrent sync created some of them first; look again
+            continue
+    raise IntegrityError(f"Could not create {table.name} rows", None, None)
+
+def _increment(model, key_columns, rows, extra=()):
+    # One executemany UPDATE adding each row's deltas; rows are sorted so concurrent syncs lock in the same order
+    table = model.__table__
+    placement = bindparam('b_placement', type_=db.Integer)
+    longest_kill = bindparam('b_longest', type_=db.Float)
+    values = {column: table.c[column] + bindparam(param) for column, param in SUMS.items()}
+    values.update({column: table.c[column] + bindparam(param) for column, param in extra})
+    values['matches'] = table.c.matches + 1
+    values['best_placement'] = case(
+        (placement <= 0, table.c.best_placement),
+        (table.c.best_placement.is_(None), placement),
+        (placement < table.c.best_placement, placement),
+        else_=table.c.best_placement
+    )
+    values['longest_kill'] = case((longest_kill > table.c.longest_kill, longest_kill), else_=table.c.longest_kill)
+    db.session.execute(
+        table.update().where(and_(*(table.c[column] == bindparam(f"k_{column}") for column in key_columns))).values(**values),
+        sorted(rows, key=lambda row: tuple(row[f"k_{column}"] for column in key_columns))
+    )
+
+def record_results(tournament, results):
+    # Fold one match's MatchResult rows into the rollups; runs inside record_match's transaction
+    if not results:
+        return
+    deltas = [{
+        'user_id': result['user_id'],
+        'b_kills': result['kills'],
+        'b_wins': 1 if result['win'] else 0,
+        'b_top10': 1 if 0 < result['placement'] <= 10 else 0,
+        'b_placed': 1 if result['placement'] > 0 else 0,
+        'b_placement': max(result['placement'], 0),
+        'b_damage': result.get('damage_dealt', 0.0),
+        'b_knocks': result.get('knocks', 0),
+        'b_headshots': result.get('headshot_kills', 0),
+        'b_longest': result.get('longest_kill', 0.0),
+    } for result in results]
+
+    created = _ensure_rows(TournamentPlayerStats, ('user_id', 'tournament_id'), {(d['user_id'], tournament.id) for d in deltas})
+    _increment(TournamentPlayerStats, ('user_id', 'tournament_id'), [
+        dict(d, k_user_id=d['user_id'], k_tournament_id=tournament.id) for d in deltas
+    ])
+
+    # A player's first match in this tournament also counts the tournament in their period totals
+    new_players = {user_id for user_id, _ in created}
+    periods = (ALL_TIME, season_for(tournament.date))
+    _ensure_rows(PlayerStats, ('user_id', 'period', 'platform'), {(d['user_id'], period, tournament.platform) for d in deltas for period in periods})
+    _increment(PlayerStats, ('user_id', 'period', 'platform'), [
+        dict(d, k_user_id=d['user_id'], k_period=period, k_platform=tournament.platform, b_tournaments=1 if d['user_id'] in new_players else 0)
+        for d in deltas for period in periods
+    ], extra=(('tournaments', 'b_tournaments'),))
+
+def _totals(source):
+    # Aggregate columns over `source` (MatchResult or TournamentPlayerStats) in StatTotals order
+    if source is MatchResult:
+        return [
+            func.count(),
+            func.sum(source.kills),
+            func.sum(case((source.win, 1), else_=0)),
+            func.sum(case((and_(source.placement > 0, source.placement <= 10), 1), else_=0)),
+            func.sum(case((source.placement > 0, 1), else_=0)),
+            func.sum(case((source.placement > 0, source.placement), else_=0)),
+            func.min(case((source.placement > 0, source.placement))),
+            func.sum(func.coalesce(source.damage_dealt, 0.0)),
+            func.sum(func.coalesce(source.knocks, 0)),
+            func.sum(func.coalesce(source.headshot_kills, 0)),
+            func.max(func.coalesce(source.longest_kill, 0.0)),
+        ]
+    return [
+        func.sum(source.matches),
+        func.sum(source.kills),
+        func.sum(source.wins),
+        func.sum(source.top10),
+        func.sum(source.placed),
+        func.sum(source.placement_total),
+        func.min(source.best_placement),
+        func.sum(source.damage_dealt),
+        func.sum(source.knocks),
+        func.sum(source.headshot_kills),
+        func.max(source.longest_kill),
+    ]
+
+TOTAL_COLUMNS = ['matches', 'kills', 'wins', 'top10', 'placed', 'placement_total', 'best_placement', 'damage_dealt', 'knocks', 'headshot_kills', 'longest_kill']
+
+def rebuild():
+    # Recompute every rollup from MatchResult with set-based INSERT ... SELECTs.
+    # Run it while no stat syncs are in flight. Returns (tournament rows, period rows).
+    db.session.execute(delete(PlayerStats))
+    db.session.execute(delete(TournamentPlayerStats))
+
+    db.session.execute(insert(TournamentPlayerStats).from_select(
+        ['user_id', 'tournament_id'] + TOTAL_COLUMNS,
+        select(MatchResult.user_id, TournamentMatch.tournament_id, *_totals(MatchResult))
+        .join(TournamentMatch, MatchResult.match_id == TournamentMatch.id)
+        .group_by(MatchResult.user_id, TournamentMatch.tournament_id)
+    ))
+
+    played = select(TournamentPlayerStats.tournament_id).distinct().subquery()
+    groups = db.session.execute(
+        select(Tournament.platform, func.min(Tournament.date), func.max(Tournament.date))
+        .where(Tournament.id.in_(select(played.c.tournament_id)))
+        .group_by(Tournament.platform)
+    ).all()
+
+    for platform, first, last in groups:
+        periods = [(ALL_TIME, None, None)]
+        season = season_for(first)
+        while True:
+            start, end = season_bounds(season)
+            periods.append((season, start, end))
+            if end > last:
+                break
+            season = season_for(end)
+
+        for period, start, end in periods:
+            query = (
+                select(TournamentPlayerStats.user_id, literal(period), literal(platform), func.count(), *_totals(TournamentPlayerStats))
+                .join(Tournament, TournamentPlayerStats.tournament_id == Tournament.id)
+                .where(Tournament.platform == platform)
+                .group_by(TournamentPlayerStats.user_id)
+            )
+            if start is not None:
+                query = query.where(Tournament.date >= start, Tournament.date < end)
+            db.session.execute(insert(PlayerStats).from_select(['user_id', 'period', 'platform', 'tournaments'] + TOTAL_COLUMNS, query))
+
+    db.session.commit()
+    return db.session.query(TournamentPlayerStats).count(), db.session.query(PlayerStats).count()
+
+def get_player_stats(user_id):
+    # One query on uq_player_stats; ALL_TIME sorts after every 'YYYY-Qn', so it comes first
+    return db.session.query(PlayerStats).filter(PlayerStats.user_id == user_id).order_by(
+        PlayerStats.period.desc(), PlayerStats.platform).all()
+
+def get_tournament_history(user_id, limit=50):
+    # The user's registrations with their per-tournament stats; one query on the registration
+    # and tournament_player_stats unique indexes however many matches were played
+    return db.session.query(Registration, Tournament, TournamentPlayerStats).join(
+        Tournament, Registration.tournament_id == Tournament.id
+    ).outerjoin(
+        TournamentPlayerStats,
+        and_(TournamentPlayerStats.user_id == Registration.user_id, TournamentPlayerStats.tournament_id == Registration.tournament_id)
+    ).filter(Registration.user_id == user_id).order_by(Tournament.date.desc(), Tournament.id.desc()).limit(limit).all()
@@ -1,43 +1,230 @@
 import requests
+from requests.adapters import HTTPAdapter
 import os
+import time
+import threading
+import logging
+from match_cache import MatchCache
+from telemetry import iter_json_array, TelemetrySummary
+from metrics import outbound
+
+logger = logging.getLogger(__name__)
+
+class RateLimiter:
+    # Client-side token bucket, kept in sync with the X-RateLimit-* headers the API returns
+    def __init__(self, capacity=10, period=60):
+        self.capacity = capacity
+        self.period = period
+        self.tokens = capacity
+        self.reset_at = time.time() + period
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.time()
+                if now >= self.reset_at:
+                    self.tokens = self.capacity
+                    self.reset_at = now + self.period
+                if self.tokens > 0:
+                    self.tokens -= 1
+                    return
+                wait = self.reset_at - now
+            time.sleep(wait)
+
+    def update(self, headers):
+        try:
+            limit = headers.get('X-RateLimit-Limit')
+            remaining = headers.get('X-RateLimit-Remaining')
+            reset = headers.get('X-RateLimit-Reset')
+            with self.lock:
+                if limit is not None:
+                    self.capacity = int(limit)
+                if remaining is not None:
+                    self.tokens = int(remaining)
+                if reset is not None:
+                    self.reset_at = float(reset)
+        except ValueError:
+            logger.warning("Ignoring malformed PUBG rate limit headers")
+
+    def seconds_until_reset(self):
+        with self.lock:
+            return max(0.0, self.reset_at - time.time())
+
+class PUBGMatch:
+    # Indexes a match document once so per-player lookups are O(1)
+    def __init__(self, match_data):
+        self.match_data = match_data
+        self.players = {}  # playerId -> stats
+        self.rosters = {}  # roster id -> {'team_id', 'rank', 'won', 'players'}
+        self.player_rosters = {}  # playerId -> roster id
+        self.telemetry_url = None
+
+        participant_players = {}
+        roster_participants = {}
+        for item in match_data.get('included', []):
+            item_type = item.get('type')
+            attributes = item.get('attributes', {})
+            if item_type == 'participant':
+                stats = attributes.get('stats', {})
+                player_id = stats.get('playerId')
+                if not player_id:
+                    continue
+                participant_players[item.get('id')] = player_id
+                self.players[player_id] = {
+                    'kills': stats.get('kills', 0),
+                    'placement': stats.get('winPlace', 0),
+                    'win': stats.get('winPlace') == 1
+                }
+            elif item_type == 'roster':
+                stats = attributes.get('stats', {})
+                self.rosters[item.get('id')] = {
+                    'team_id': stats.get('teamId'),
+                    'rank': stats.get('rank'),
+                    'won': attributes.get('won') == 'true',
+                    'players': []
+                }
+                participants = item.get('relationships', {}).get('participants', {}).get('data', [])
+                roster_participants[item.get('id')] = [p.get('id') for p in participants]
+            elif item_type == 'asset' and attributes.get('name') == 'telemetry':
+                self.telemetry_url = attributes.get('URL')
+
+        for roster_id, participant_ids in roster_participants.items():
+            for participant_id in participant_ids:
+                player_id = participant_players.get(participant_id)
+                if player_id:
+                    self.rosters[roster_id]['players'].append(player_id)
+                    self.player_rosters[player_id] = roster_id
+
+    def get_player_stats(self, account_id):
+        return self.players.get(account_id)
+
+    def get_roster(self, account_id):
+        roster_id = self.player_rosters.get(account_id)
+        return self.rosters.get(roster_id) if roster_id else None
 
 class PUBGAPI:
-    def __init__(self, api_key=None):
+    # The players endpoint accepts at most 10 comma-separated names per request
+    PLAYER_BATCH_SIZE = 10
+
+    # Retried with backoff; anything else is returned to the caller as-is
+    RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+    def __init__(self, api_key=None, base_url=None, timeout=None, max_retries=3, backoff=0.5, rate_limit=10, pool_size=10, match_cache=None):
         self.api_key = api_key or os.environ.get('PUBG_API_KEY')
-        self.base_url = "https://api.pubg.com/shards"
+        self.base_url = base_url or os.environ.get('PUBG_API_BASE_URL', "https://api.pubg.com/shards")
         self.headers = {
             "Authorization": f"Bearer {self.api_key}",
             "Accept": "application/vnd.api+json"
         }
+        # (connect, read) timeouts in seconds
+        self.timeout = timeout or (3.05, float(os.environ.get('PUBG_API_TIMEOUT', 10)))
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.rate_limiter = RateLimiter(capacity=rate_limit)
+        self.match_cache = match_cache or MatchCache()
+
+        # Keep-alive connection pool shared by every call on this client
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def _get(self, path, params=None, rate_limited=True):
+        # Only the players endpoints count against the API key's rate limit, matches are exempt
+        url = f"{self.base_url}/{path}"
+        for attempt in range(self.max_retries + 1):
+            if rate_limited:
+                self.rate_limiter.acquire()
+            try:
+                with outbound('pubg'):
+                    response = self.session.get(url, params=params, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                logger.warning(f"PUBG API request to {path} failed: {e}")
+                if attempt == self.max_retries:
+                    return None
+                time.sleep(self.backoff * 2 ** attempt)
+                continue
+
+            if rate_limited:
+                self.rate_limiter.update(response.headers)
+            if response.status_code not in self.RETRY_STATUSES or attempt == self.max_retries:
+                return response
+
+            if response.status_code == 429:
+                wait = max(self.rate_limiter.seconds_until_reset(), self.backoff * 2 ** attempt)
+            else:
+                wait = self.backoff * 2 ** attempt
+            logger.warning(f"PUBG API returned {response.status_code} for {path}, retrying in {wait:.1f}s")
+            time.sleep(wait)
+        return None
+
+    def get_shard(self, platform):
+        # Platform should be 'xbox' or 'psn'; tournaments also use labels like 'Xbox Series'
+        return "xbox" if platform.lower().startswith("xbox") else "psn"
 
     def get_player_stats(self, platform, gamertag):
-        # Platform should be 'xbox' or 'psn'
-        shard = "xbox" if platform.lower() == "xbox" else "psn"
-        url = f"{self.base_url}/{shard}/players?filter[playerNames]={gamertag}"
-        response = requests.get(url, headers=self.headers)
-        if response.status_code == 200:
+        shard = self.get_shard(platform)
+        response = self._get(f"{shard}/players", params={'filter[playerNames]': gamertag})
+        if response is not None and response.status_code == 200:
             return response.json()
         return None
 
+    def get_account_ids(self, platform, gamertags):
+        # Resolve many gamertags at once, returns {gamertag: account_id} for the ones found.
+        # PUBG answers with its own casing of each name, so match them case-insensitively.
+        shard = self.get_shard(platform)
+        requested = {}
+        for gamertag in gamertags:
+            if gamertag:
+                requested.setdefault(gamertag.lower(), []).append(gamertag)
+        names = [tags[0] for tags in requested.values()]
+        account_ids = {}
+        for i in range(0, len(names), self.PLAYER_BATCH_SIZE):
+            batch = names[i:i + self.PLAYER_BATCH_SIZE]
+            response = self._get(f"{shard}/players", params={'filter[playerNames]': ','.join(batch)})
+            if response is None or response.status_code != 200:
+                continue
+            for player in response.json().get('data', []):
+                name = player.get('attributes', {}).get('name')
+                for gamertag in requested.get(name.lower(), []) if name else []:
+                    account_ids[gamertag] = player['id']
+        return account_ids
+
     def get_match_details(self, platform, match_id):
-        shard = "xbox" if platform.lower() == "xbox" else "psn"
-        url = f"{self.base_url}/{shard}/matches/{match_id}"
-        response = requests.get(url, headers=self.headers)
-        if response.status_code == 200:
-            return response.json()
+        shard = self.get_shard(platform)
+        match_data = self.match_cache.get(shard, match_id)
+        if match_data is not None:
+            return match_data
+        response = self._get(f"{shard}/matches/{match_id}", rate_limited=False)
+        if response is not None and response.status_code == 200:
+            match_data = response.json()
+            self.match_cache.set(shard, match_id, match_data)
+            return match_data
         return None
 
+    def iter_telemetry(self, telemetry_url, chunk_size=64 * 1024):
+        # Stream telemetry events one at a time; files run to tens of MB so never call .json() on them.
+        # The telemetry CDN needs no API key, so don't send ours there.
+        with self.session.get(telemetry_url, headers={'Authorization': None, 'Accept-Encoding': 'gzip'}, stream=True, timeout=self.timeout) as response:
+            response.raise_for_status()
+            yield from iter_json_array(response.iter_content(chunk_size=chunk_size))
+
+    def get_telemetry_summary(self, telemetry_url, account_ids=None):
+        # Per-player damage, knocks, kill details and timeline, optionally limited to account_ids
+        try:
+            return TelemetrySummary(account_ids).consume(self.iter_telemetry(telemetry_url))
+        except (requests.RequestException, ValueError) as e:
+            logger.warning(f"Could not read telemetry {telemetry_url}: {e}")
+            return None
+
+    def parse_match(self, match_data):
+        return PUBGMatch(match_data)
+
     def extract_player_stats_from_match(self, match_data, account_id):
         # Extract kills and placement for a specific player from match data
-        included = match_data.get('included', [])
-        for item in included:
-            if item.get('type') == 'participant':
-                attributes = item.get('attributes', {})
-                stats = attributes.get('stats', {})
-                if stats.get('playerId') == account_id:
-                    return {
-                        'kills': stats.get('kills', 0),
-                        'placement': stats.get('winPlace', 0),
-                        'win': stats.get('winPlace') == 1
-                    }
-        return None
+        # Prefer parse_match() when looking up more than one player in the same match
+        if not isinstance(match_data, PUBGMatch):
+            match_data = self.parse_match(match_data)
+        return match_data.get_player_stats(account_id)
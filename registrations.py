@@ -0,0 +1,58 @@
+from sqlalchemy import update
+from sqlalchemy.exc import IntegrityError
+
+from extensions import db
+from models import Tournament, Registration
+from http_cache import bump_version
+
+def join_tournament(tournament_id, user_id):
+    # Returns 'registered', 'waitlisted' or 'duplicate'.
+    # The unique (user_id, tournament_id) constraint rejects duplicates before we touch the
+    # tournament row, and the slot is taken with a conditional UPDATE as the last statement,
+    # so the hot row is only locked for the commit and max_players can never be exceeded.
+    registration = Registration(user_id=user_id, tournament_id=tournament_id, status='registered')
+    db.session.add(registration)
+    try:
+        db.session.flush()
+    except IntegrityError:
+        db.session.rollback()
+        return 'duplicate'
+
+    got_slot = db.session.execute(
+        update(Tournament)
+        .where(Tournament.id == tournament_id, Tournament.slots_taken < Tournament.max_players)
+        .values(slots_taken=Tournament.slots_taken + 1)
+    ).rowcount
+    if not got_slot:
+        registration.status = 'waitlisted'
+    status = registration.status
+    db.session.commit()
+    bump_version()
+    return status
+
+def leave_tournament(tournament_id, user_id):
+    # Frees the slot and hands it to the longest-waiting player; returns False if not registered
+    registration = db.session.query(Registration).filter_by(tournament_id=tournament_id, user_id=user_id).first()
+    if registration is None:
+        return False
+    held_slot = registration.status == 'registered'
+    db.session.delete(registration)
+    db.session.flush()
+
+    if held_slot:
+        promoted = False
+        waiting = db.session.query(Registration.id).filter_by(tournament_id=tournament_id, status='waitlisted').order_by(Registration.id).limit(5).all()
+        for (registration_id,) in waiting:
+            # Conditional so two concurrent withdrawals never promote the same player
+            if db.session.execute(
+                update(Registration).where(Registration.id == registration_id, Registration.status == 'waitlisted').values(status='registered')
+            ).rowcount:
+                promoted = True
+                break
+        if not promoted:
+            db.session.execute(
+                update(Tournament).where(Tournament.id == tournament_id, Tournament.slots_taken > 0).values(slots_taken=Tournament.slots_taken - 1)
+            )
+    db.session.commit()
+    bump_version()
+    return True
@@ -0,0 +1,48 @@
+-- Brings a database created before the stat sync, payout batching and player stats work up to
+-- the current models. `flask init-db` only creates missing tables, so run it first (it adds
+-- sync_job, tournament_player_stats, player_stats and data_version), then this file once,
+-- then `flask rebuild-stats`. Works on SQLite and PostgreSQL.
+--
+--   sqlite3 pubg_tournaments.db < schema_upgrade.sql
+--   psql "$DATABASE_URL" -f schema_upgrade.sql
+
+ALTER TABLE "user" ADD COLUMN xbox_account_id VARCHAR(100);
+ALTER TABLE "user" ADD COLUMN psn_account_id VARCHAR(100);
+ALTER TABLE "user" ADD COLUMN version INTEGER NOT NULL DEFAULT 0;
+CREATE INDEX ix_user_leaderboard ON "user" (total_wins, total_kills, id);
+CREATE INDEX ix_user_platform_leaderboard ON "user" (platform, total_wins, total_kills, id);
+
+ALTER TABLE tournament ADD COLUMN slots_taken INTEGER DEFAULT 0;
+ALTER TABLE tournament ADD COLUMN scoring JSON;
+CREATE INDEX ix_tournament_date ON tournament (date, id);
+CREATE INDEX ix_tournament_status_date ON tournament (status, date, id);
+
+-- Remove duplicate (tournament_id, match_id) rows before this, or the unique index fails
+CREATE UNIQUE INDEX uq_tournament_match ON tournament_match (tournament_id, match_id);
+CREATE INDEX ix_tournament_match_tournament_id ON tournament_match (tournament_id);
+
+ALTER TABLE match_result ADD COLUMN damage_dealt FLOAT DEFAULT 0;
+ALTER TABLE match_result ADD COLUMN damage_taken FLOAT DEFAULT 0;
+ALTER TABLE match_result ADD COLUMN knocks INTEGER DEFAULT 0;
+ALTER TABLE match_result ADD COLUMN headshot_kills INTEGER DEFAULT 0;
+ALTER TABLE match_result ADD COLUMN longest_kill FLOAT DEFAULT 0;
+ALTER TABLE match_result ADD COLUMN timeline JSON;
+CREATE INDEX ix_match_result_match_id ON match_result (match_id);
+
+-- Likewise for duplicate (user_id, tournament_id) registrations
+ALTER TABLE registration ADD COLUMN status VARCHAR(20) DEFAULT 'registered';
+CREATE UNIQUE INDEX uq_registration_user_tournament ON registration (user_id, tournament_id);
+CREATE INDEX ix_registration_tournament_id ON registration (tournament_id);
+UPDATE tournament SET slots_taken = (
+    SELECT count(*) FROM registration
+    WHERE registration.tournament_id = tournament.id AND registration.status = 'registered'
+);
+
+-- Pending payouts without a receiver are sent to the user's current PayPal email
+ALTER TABLE payout ADD COLUMN receiver VARCHAR(120);
+ALTER TABLE payout ADD COLUMN sender_batch_id VARCHAR(64);
+ALTER TABLE payout ADD COLUMN payout_batch_id VARCHAR(64);
+ALTER TABLE payout ADD COLUMN error VARCHAR(255);
+CREATE INDEX ix_payout_status ON payout (status);
+CREATE INDEX ix_payout_sender_batch_id ON payout (sender_batch_id);
+CREATE INDEX ix_payout_payout_batch_id ON payout (payout_batch_id);
@@ -0,0 +1,120 @@
+import threading
+
+import numpy as np
+
+from extensions import db
+from models import TournamentMatch, MatchResult
+
+# PUBG esports-style defaults: placement points for the top 8 plus one point per kill
+DEFAULT_PLACEMENT_POINTS = {1: 10, 2: 6, 3: 5, 4: 4, 5: 3, 6: 2, 7: 1, 8: 1}
+DEFAULT_KILL_POINTS = 1.0
+MAX_PLACEMENT = 100
+
+# Columns of TournamentStandings.totals
+POINTS, PLACEMENT_POINTS, KILLS, WINS, MATCHES = range(5)
+
+class ScoringRules:
+    def __init__(self, placement_points=None, kill_points=DEFAULT_KILL_POINTS):
+        placement_points = placement_points or DEFAULT_PLACEMENT_POINTS
+        self.kill_points = float(kill_points)
+        # Index by placement; 0 (unknown) and anything past the table score nothing
+        self.placement_table = np.zeros(MAX_PLACEMENT + 1)
+        for place, points in placement_points.items():
+            place = int(place)
+            if 1 <= place <= MAX_PLACEMENT:
+                self.placement_table[place] = float(points)
+
+    @classmethod
+    def from_tournament(cls, tournament):
+        scoring = tournament.scoring or {}
+        return cls(scoring.get('placement_points'), scoring.get('kill_points', DEFAULT_KILL_POINTS))
+
+    def __eq__(self, other):
+        return isinstance(other, ScoringRules) and self.kill_points == other.kill_points and np.array_equal(self.placement_table, other.placement_table)
+
+class TournamentStandings:
+    # Running per-player totals for one tournament, grown one batch of matches at a time
+    def __init__(self, rules):
+        self.rules = rules
+        self.match_ids = set()
+        self.user_ids = np.empty(0, dtype=np.int64)  # kept sorted for searchsorted
+        self.totals = np.zeros((0, 5))
+        self.last_placement = np.empty(0, dtype=np.int64)
+        self.ranked = []
+
+    def add_results(self, match_ids, user_ids, kills, placements, wins):
+        # Arrays hold one row per MatchResult, ordered by match so later matches win for last_placement
+        new_users = np.setdiff1d(np.unique(user_ids), self.user_ids)
+        if new_users.size:
+            user_ids_all = np.concatenate([self.user_ids, new_users])
+            order = np.argsort(user_ids_all, kind='stable')
+            self.user_ids = user_ids_all[order]
+            self.totals = np.vstack([self.totals, np.zeros((new_users.size, 5))])[order]
+            self.last_placement = np.concatenate([self.last_placement, np.zeros(new_users.size, dtype=np.int64)])[order]
+
+        placements = np.clip(placements, 0, MAX_PLACEMENT)
+        placement_points = self.rules.placement_table[placements]
+        kill_points = kills * self.rules.kill_points
+        rows = np.column_stack([
+            placement_points + kill_points,
+            placement_points,
+            kills,
+            wins,
+            np.ones(len(user_ids))
+        ])
+        idx = np.searchsorted(self.user_ids, user_ids)
+        np.add.at(self.totals, idx, rows)
+        # Repeated indices in an assignment leave the winner undefined, so take each user's last row explicitly
+        users, first = np.unique(idx[::-1], return_index=True)
+        self.last_placement[users] = placements[::-1][first]
+        self.match_ids.update(int(m) for m in np.unique(match_ids))
+        self._rank()
+
+    def _rank(self):
+        # Tiebreakers: points, wins, placement points, kills, then placement in the most recent match
+        last = np.where(self.last_placement > 0, self.last_placement, MAX_PLACEMENT + 1)
+        t = self.totals
+        order = np.lexsort((last, -t[:, KILLS], -t[:, PLACEMENT_POINTS], -t[:, WINS], -t[:, POINTS]))
+        self.ranked = [
+            {
+                'rank': rank,
+                'user_id': int(self.user_ids[i]),
+                'points': float(t[i, POINTS]),
+                'placement_points': float(t[i, PLACEMENT_POINTS]),
+                'kills': int(t[i, KILLS]),
+                'wins': int(t[i, WINS]),
+                'matches': int(t[i, MATCHES])
+            }
+            for rank, i in enumerate(order.tolist(), start=1)
+        ]
+
+class StandingsEngine:
+    # Per-process cache of tournament standings. Each lookup checks which TournamentMatch rows
+    # exist and folds in only the unseen ones, so other processes' syncs are picked up too.
+    def __init__(self):
+        self.cache = {}
+        self.lock = threading.Lock()
+
+    def standings(self, tournament):
+        rules = ScoringRules.from_tournament(tournament)
+        match_ids = {row.id for row in db.session.query(TournamentMatch.id).filter_by(tournament_id=tournament.id)}
+
+        with self.lock:
+            state = self.cache.get(tournament.id)
+            if state is None or state.rules != rules or not state.match_ids <= match_ids:
+                state = self.cache[tournament.id] = TournamentStandings(rules)
+            unseen = match_ids - state.match_ids
+            if unseen:
+                rows = db.session.query(
+                    MatchResult.match_id, MatchResult.user_id, MatchResult.kills, MatchResult.placement, MatchResult.win
+                ).filter(MatchResult.match_id.in_(unseen)).order_by(MatchResult.match_id).all()
+                if rows:
+                    columns = np.array([(m, u, k or 0, p or 0, int(bool(w))) for m, u, k, p, w in rows], dtype=np.int64)
+                    state.add_results(*columns.T)
+                # Matches without any registered players still count as seen
+                state.match_ids.update(unseen)
+            return state.ranked
+
+    def invalidate(self, tournament_id):
+        with self.lock:
+            self.cache.pop(tournament_id, None)
@@ -0,0 +1,199 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from sqlalchemy import insert, bindparam
+from sqlalchemy.exc import IntegrityError
+
+from extensions import db
+from models import User, Registration, TournamentMatch, MatchResult, SyncJob
+from http_cache import bump_version
+import user_cache
+from player_stats import record_results
+
+class SyncError(Exception):
+    pass
+
+class MatchAlreadyRecorded(SyncError):
+    # The tournament already has results for this PUBG match
+    pass
+
+def fetch_match(pubg_api, tournament, match_id):
+    match_data = pubg_api.get_match_details(tournament.platform, match_id)
+    if not match_data:
+        raise SyncError("Could not fetch match data from PUBG API.")
+    return pubg_api.parse_match(match_data)
+
+def get_players(pubg_api, tournament):
+    # (user_id, account_id) for registered users whose PUBG account is known
+    registrations = db.session.query(Registration, User).join(User, Registration.user_id == User.id).filter(Registration.tournament_id == tournament.id, Registration.status == 'registered').all()
+    players = [user for _, user in registrations if user.gamertag_for(tournament.platform)]
+
+    # Resolve account IDs we haven't cached yet in as few API calls as possible
+    unresolved = [user for user in players if not user.account_id_for(tournament.platform)]
+    if unresolved:
+        account_ids = pubg_api.get_account_ids(tournament.platform, [user.gamertag_for(tournament.platform) for user in unresolved])
+        for user in unresolved:
+            account_id = account_ids.get(user.gamertag_for(tournament.platform))
+            if account_id:
+                user.set_account_id(tournament.platform, account_id)
+    return [(user.id, user.account_id_for(tournament.platform)) for user in players if user.account_id_for(tournament.platform)]
+
+def fetch_telemetry(pubg_api, match, players):
+    if not match.telemetry_url:
+        return None
+    return pubg_api.get_telemetry_summary(match.telemetry_url, [account_id for _, account_id in players])
+
+def record_match(tournament, match_id, match, players, telemetry=None, job=None):
+    # Write one match's results and user counter updates in a single transaction.
+    # telemetry is an optional {account_id: aggregates} from PUBGAPI.get_telemetry_summary;
+    # job, if given, is the match's SyncJob and is marked completed in the same transaction.
+    new_match = TournamentMatch(tournament_id=tournament.id, match_id=match_id)
+    db.session.add(new_match)
+    try:
+        db.session.flush()
+    except IntegrityError:
+        # uq_tournament_match: another sync recorded it first, so nobody is paid twice
+        db.session.rollback()
+        raise MatchAlreadyRecorded(f"Match {match_id} is already recorded for this tournament.")
+
+    # Award prize for winning (Total Prize Pool = base + donations + sponsor credits)
+    prize = tournament.total_prize_pool
+    results = []
+    counters = []
+    for user_id, account_id in players:
+        stats = match.get_player_stats(account_id)
+        if not stats:
+            continue
+        result = {
+            'match_id': new_match.id,
+            'user_id': user_id,
+            'kills': stats['kills'],
+            'placement': stats['placement'],
+            'win': stats['win']
+        }
+        aggregates = telemetry.get(account_id) if telemetry else None
+        if aggregates:
+            result.update({
+                'damage_dealt': round(aggregates['damage_dealt'], 1),
+                'damage_taken': round(aggregates['damage_taken'], 1),
+                'knocks': aggregates['knocks'],
+                'headshot_kills': aggregates['headshot_kills'],
+                'longest_kill': round(aggregates['longest_kill'], 1),
+                'timeline': aggregates['timeline']
+            })
+        results.append(result)
+        counters.append({
+            'b_user_id': user_id,
+            'b_kills': stats['kills'],
+            'b_wins': 1 if stats['win'] else 0,
+            'b_prize': prize if stats['win'] else 0.0
+        })
+
+    if results:
+        db.session.execute(insert(MatchResult), results)
+        record_results(tournament, results)
+        # Increment in SQL so concurrent syncs never overwrite each other's totals
+        users = User.__table__
+        db.session.execute(
+            users.update()
+            .where(users.c.id == bindparam('b_user_id'))
+            .values(
+                total_kills=users.c.total_kills + bindparam('b_kills'),
+                total_wins=users.c.total_wins + bindparam('b_wins'),
+                balance=users.c.balance + bindparam('b_prize'),
+                version=users.c.version + 1
+            ),
+            counters
+        )
+    if job is not None:
+        job.status = 'completed'
+        job.error = None
+        job.finished_at = datetime.utcnow()
+    db.session.commit()
+    bump_version()
+    user_cache.invalidate(*(counter['b_user_id'] for counter in counters))
+    return new_match
+
+def sync_match(pubg_api, tournament, match_id, telemetry=False, job=None):
+    # Fetch one PUBG match and record results for every registered player in it
+    match = fetch_match(pubg_api, tournament, match_id)
+    players = get_players(pubg_api, tournament)
+    summary = fetch_telemetry(pubg_api, match, players) if telemetry else None
+    return record_match(tournament, match_id, match, players, summary, job=job)
+
+def claim_job(tournament, match_id, shard):
+    # Take the match's SyncJob as 'running' (creating it if needed), or return None if it is
+    # already running or completed elsewhere; the unique constraint settles concurrent claims
+    values = {'status': 'running', 'started_at': datetime.utcnow(), 'error': None, 'attempts': SyncJob.attempts + 1}
+    claimed = db.session.query(SyncJob).filter(
+        SyncJob.tournament_id == tournament.id, SyncJob.match_id == match_id, SyncJob.status.in_(('queued', 'failed'))
+    ).update(values, synchronize_session=False)
+    if not claimed:
+        try:
+            with db.session.begin_nested():
+                db.session.add(SyncJob(tournament_id=tournament.id, match_id=match_id, shard=shard, status='running', started_at=datetime.utcnow(), attempts=1))
+        except IntegrityError:
+            db.session.commit()
+            return None
+    db.session.commit()
+    return db.session.query(SyncJob).filter_by(tournament_id=tournament.id, match_id=match_id).one()
+
+def ingest_matches(pubg_api, tournament, match_ids, workers=8, telemetry=False):
+    # Backfill many matches: downloads run concurrently, writes stay on this thread
+    # with one transaction per match. Returns {match_id: 'ingested' | 'skipped' | error}.
+    match_ids = list(dict.fromkeys(match_ids))
+    done = {
+        row.match_id for row in db.session.query(TournamentMatch.match_id).filter(
+            TournamentMatch.tournament_id == tournament.id, TournamentMatch.match_id.in_(match_ids))
+    }
+    # Claim every job before downloading, so the web queue can't run the same match meanwhile
+    shard = pubg_api.get_shard(tournament.platform)
+    jobs = {}
+    for match_id in match_ids:
+        job = None if match_id in done else claim_job(tournament, match_id, shard)
+        if job is not None:
+            jobs[match_id] = job
+    outcome = {match_id: 'skipped' for match_id in match_ids if match_id not in jobs}
+    if not jobs:
+        return outcome
+
+    job_ids = {match_id: job.id for match_id, job in jobs.items()}
+    try:
+        players = get_players(pubg_api, tournament)
+
+        def download(match_id):
+            match_data = pubg_api.get_match_details(tournament.platform, match_id)
+            if not match_data:
+                return None, None
+            match = pubg_api.parse_match(match_data)
+            return match, fetch_telemetry(pubg_api, match, players) if telemetry else None
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {match_id: pool.submit(download, match_id) for match_id in jobs}
+            for match_id, job in jobs.items():
+                match, summary = futures[match_id].result()
+                if match is None:
+                    job.status = 'failed'
+                    job.error = outcome[match_id] = "Could not fetch match data from PUBG API."
+                    job.finished_at = datetime.utcnow()
+                    db.session.commit()
+                    continue
+                try:
+                    record_match(tournament, match_id, match, players, summary, job=job)
+                    outcome[match_id] = 'ingested'
+                except MatchAlreadyRecorded:
+                    job = db.session.get(SyncJob, job.id)
+                    job.status = 'completed'
+                    job.finished_at = datetime.utcnow()
+                    db.session.commit()
+                    outcome[match_id] = 'skipped'
+    except Exception as e:
+        # Don't leave the rest claimed as 'running'; only the sync workers' stale sweep would free them
+        db.session.rollback()
+        unfinished = [job_id for match_id, job_id in job_ids.items() if match_id not in outcome]
+        db.session.query(SyncJob).filter(SyncJob.id.in_(unfinished), SyncJob.status == 'running').update(
+            {'status': 'failed', 'error': str(e)[:255], 'finished_at': datetime.utcnow()}, synchronize_session=False
+        )
+        db.session.commit()
+        raise
+    return {match_id: outcome[match_id] for match_id in match_ids}
@@ -0,0 +1,147 @@
+import json
+import zlib
+import codecs
+from datetime import datetime
+
+GZIP_MAGIC = b'\x1f\x8b'
+MAX_STEP = 64 * 1024
+
+def decompress(chunks):
+    # Pass chunks through, gunzipping on the fly if the body itself is gzip
+    # (Content-Encoding: gzip is already undone by requests)
+    decompressor = None
+    for chunk in chunks:
+        if not chunk:
+            continue
+        if decompressor is None:
+            decompressor = zlib.decompressobj(zlib.MAX_WBITS | 16) if chunk.startswith(GZIP_MAGIC) else False
+        if decompressor:
+            # Cap each step's output so a highly compressed chunk can't balloon in memory
+            while chunk:
+                data = decompressor.decompress(chunk, MAX_STEP)
+                chunk = decompressor.unconsumed_tail
+                if data:
+                    yield data
+        else:
+            yield chunk
+    if decompressor:
+        data = decompressor.flush()
+        if data:
+            yield data
+
+def iter_json_array(chunks):
+    # Yield the objects of a top-level JSON array from a stream of byte chunks,
+    # holding at most one partial event in memory at a time
+    decoder = json.JSONDecoder()
+    text = codecs.getincrementaldecoder('utf-8')()
+    buf = ''
+    started = False
+    for chunk in decompress(chunks):
+        buf += text.decode(chunk)
+        pos = 0
+        length = len(buf)
+        if not started:
+            while pos < length and buf[pos].isspace():
+                pos += 1
+            if pos == length:
+                buf = ''
+                continue
+            if buf[pos] != '[':
+                raise ValueError("Telemetry is not a JSON array")
+            started = True
+            pos += 1
+        while True:
+            while pos < length and (buf[pos].isspace() or buf[pos] == ','):
+                pos += 1
+            if pos == length:
+                break
+            if buf[pos] == ']':
+                return
+            try:
+                event, end = decoder.raw_decode(buf, pos)
+            except ValueError:
+                # Event is split across chunks; wait for more data
+                break
+            yield event
+            pos = end
+        buf = buf[pos:]
+    if buf.strip():
+        raise ValueError("Telemetry stream ended mid-event")
+
+def parse_time(value):
+    try:
+        return datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except (AttributeError, ValueError):
+        return None
+
+class TelemetrySummary:
+    # Folds telemetry events into a few numbers per player, so memory stays
+    # proportional to the lobby size rather than the length of the log
+    def __init__(self, account_ids=None):
+        self.account_ids = set(account_ids) if account_ids else None
+        self.match_start = None
+        self.players = {}
+
+    def _player(self, account_id):
+        if not account_id or (self.account_ids is not None and account_id not in self.account_ids):
+            return None
+        player = self.players.get(account_id)
+        if player is None:
+            player = self.players[account_id] = {
+                'damage_dealt': 0.0,
+                'damage_taken': 0.0,
+                'knocks': 0,
+                'headshot_kills': 0,
+                'longest_kill': 0.0,
+                'timeline': []  # [seconds into match, 'knock' | 'kill' | 'death', other account id]
+            }
+        return player
+
+    def _elapsed(self, event):
+        if self.match_start is None:
+            return None
+        timestamp = parse_time(event.get('_D'))
+        return round((timestamp - self.match_start).total_seconds(), 1) if timestamp else None
+
+    def add(self, event):
+        event_type = event.get('_T')
+        if event_type == 'LogMatchStart':
+            self.match_start = parse_time(event.get('_D'))
+        elif event_type == 'LogPlayerTakeDamage':
+            attacker_id = (event.get('attacker') or {}).get('accountId')
+            victim_id = (event.get('victim') or {}).get('accountId')
+            damage = event.get('damage') or 0.0
+            victim = self._player(victim_id)
+            if victim:
+                victim['damage_taken'] += damage
+            if attacker_id != victim_id:
+                attacker = self._player(attacker_id)
+                if attacker:
+                    attacker['damage_dealt'] += damage
+        elif event_type == 'LogPlayerMakeGroggy':
+            attacker_id = (event.get('attacker') or {}).get('accountId')
+            victim_id = (event.get('victim') or {}).get('accountId')
+            attacker = self._player(attacker_id)
+            if attacker and attacker_id != victim_id:
+                attacker['knocks'] += 1
+                attacker['timeline'].append([self._elapsed(event), 'knock', victim_id])
+        elif event_type == 'LogPlayerKillV2':
+            killer_id = (event.get('killer') or {}).get('accountId')
+            victim_id = (event.get('victim') or {}).get('accountId')
+            elapsed = self._elapsed(event)
+            killer = self._player(killer_id)
+            if killer and killer_id != victim_id:
+                damage_info = event.get('killerDamageInfo') or {}
+                if damage_info.get('damageReason') == 'HeadShot':
+                    killer['headshot_kills'] += 1
+                # Distances are reported in centimetres
+                killer['longest_kill'] = max(killer['longest_kill'], (damage_info.get('distance') or 0.0) / 100)
+                killer['timeline'].append([elapsed, 'kill', victim_id])
+            victim = self._player(victim_id)
+            if victim:
+                victim['timeline'].append([elapsed, 'death', killer_id])
+
+    def consume(self, events):
+        for event in events:
+            self.add(event)
+        return self.players
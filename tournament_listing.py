@@ -0,0 +1,61 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import tuple_, func
+
+from extensions import db
+from models import Tournament, Registration
+
+STATUSES = ('upcoming', 'ongoing', 'completed')
+
+def parse_date(value):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d')
+    except (TypeError, ValueError):
+        return None
+
+def encode_cursor(tournament):
+    return f"{tournament.date.strftime('%Y%m%d%H%M%S%f')}.{tournament.id}"
+
+def decode_cursor(cursor):
+    try:
+        date, tournament_id = cursor.split('.')
+        return datetime.strptime(date, '%Y%m%d%H%M%S%f'), int(tournament_id)
+    except (AttributeError, ValueError):
+        return None
+
+def get_tournament_page(status=None, date_from=None, date_to=None, cursor=None, per_page=24):
+    # Newest first, keyset-paginated on (date, id) so it is served by the
+    # ix_tournament_date / ix_tournament_status_date indexes however deep the archive goes.
+    # Returns (tournaments, next_cursor or None).
+    query = db.session.query(Tournament)
+    if status:
+        query = query.filter(Tournament.status == status)
+    if date_from:
+        query = query.filter(Tournament.date >= date_from)
+    if date_to:
+        query = query.filter(Tournament.date < date_to + timedelta(days=1))
+
+    position = decode_cursor(cursor) if cursor else None
+    if position:
+        query = query.filter(tuple_(Tournament.date, Tournament.id) < position)
+
+    tournaments = query.order_by(Tournament.date.desc(), Tournament.id.desc()).limit(per_page + 1).all()
+    next_cursor = encode_cursor(tournaments[per_page - 1]) if len(tournaments) > per_page else None
+    return tournaments[:per_page], next_cursor
+
+def get_waitlist_counts(tournament_ids):
+    # One grouped query for the whole page instead of a count per card
+    if not tournament_ids:
+        return {}
+    rows = db.session.query(Registration.tournament_id, func.count()).filter(
+        Registration.tournament_id.in_(tournament_ids), Registration.status == 'waitlisted'
+    ).group_by(Registration.tournament_id).all()
+    return dict(rows)
+
+def card_key(tournament, waitlisted):
+    # Everything _tournament_card.html displays
+    return (
+        tournament.id, tournament.title, tournament.platform, tournament.status, tournament.date,
+        tournament.base_prize_pool, tournament.donation_total, tournament.sponsor_credit_total,
+        tournament.slots_taken, tournament.max_players, waitlisted
+    )
@@ -0,0 +1,77 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+
+from flask_login import UserMixin
+
+from extensions import db
+from models import User, is_xbox
+
+# How long a process serves a logged-in user's row without re-reading it. Changes made in this
+# process invalidate it immediately; changes from other processes (a refund in
+# `flask process-payouts`, a sync on another worker) show up within the TTL, or at once
+# on pages that load with fresh=True, which checks the row's User.version.
+TTL = float(os.environ.get('USER_CACHE_TTL', 30))
+MAX_ENTRIES = int(os.environ.get('USER_CACHE_SIZE', 4096))
+
+# What auth and the templates read off current_user
+FIELDS = ('id', 'version', 'username', 'email', 'platform', 'xbox_gamertag', 'psn_id', 'paypal_email', 'balance', 'total_kills', 'total_wins')
+
+_lock = threading.Lock()
+_entries = OrderedDict()  # user_id -> (SessionUser, expires)
+_counts = {'hits': 0, 'misses': 0}
+_generation = [0]  # bumped by invalidate() so a load racing a change never caches the old row
+
+class SessionUser(UserMixin):
+    # Read-only snapshot of a User for current_user; load the User row to change anything
+    def __init__(self, user):
+        for field in FIELDS:
+            setattr(self, field, getattr(user, field))
+
+    def gamertag_for(self, platform):
+        return self.xbox_gamertag if is_xbox(platform) else self.psn_id
+
+def load(user_id, fresh=False):
+    # fresh=True costs one primary key lookup of User.version instead of the whole row
+    now = time.monotonic()
+    with _lock:
+        entry = _entries.get(user_id)
+        generation = _generation[0]
+    if entry and fresh:
+        version = db.session.query(User.version).filter(User.id == user_id).scalar()
+        if version != entry[0].version:
+            entry = None
+    with _lock:
+        if entry and (fresh or now < entry[1]):
+            if fresh and generation == _generation[0]:
+                _entries[user_id] = (entry[0], now + TTL)
+            if user_id in _entries:
+                _entries.move_to_end(user_id)
+            _counts['hits'] += 1
+            return entry[0]
+        _counts['misses'] += 1
+
+    user = db.session.get(User, user_id)
+    if user is None:
+        return None
+    identity = SessionUser(user)
+    with _lock:
+        if generation != _generation[0]:
+            return identity
+        _entries[user_id] = (identity, now + TTL)
+        _entries.move_to_end(user_id)
+        while len(_entries) > MAX_ENTRIES:
+            _entries.popitem(last=False)
+    return identity
+
+def invalidate(*user_ids):
+    # Call after committing a change to these users' rows
+    with _lock:
+        _generation[0] += 1
+        for user_id in user_ids:
+            _entries.pop(user_id, None)
+
+def stats():
+    with _lock:
+        return dict(_counts, entries=len(_entries))